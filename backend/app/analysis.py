@@ -0,0 +1,172 @@
+"""
+ML stages (NER trends, market anomalies, topic clusters) in a separate process.
+
+The stages run in a single-worker process pool, so spaCy and scikit-learn
+never hold a request thread or the GIL of the API process. Requests always get
+the latest *completed* results; when a collector publishes new data the next
+request (or the SSE watcher) starts a run for it and keeps serving the
+previous results until it finishes. At most one run is queued behind the
+current one, for the newest data.
+
+A run only computes the stages that were asked for: a risk score needs market
+anomalies but not topic clusters, so scoring never starts a clustering pass.
+Each stage remembers the data version its result is for.
+
+The worker process keeps its models and caches (NER per headline, cluster
+centroids, market baseline) between runs, so cluster IDs stay stable.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+try:
+    from backend.common import metrics
+except ImportError:
+    from common import metrics
+
+STAGES = ("ml_trends", "ml_anomalies", "ml_clusters")
+
+
+def _analyzer():
+    try:
+        from backend.ml_engine import analyzer
+    except ImportError:
+        from ml_engine import analyzer
+    return analyzer
+
+
+def _init_worker(warm):
+    if warm:
+        _analyzer().warm_up()
+
+
+def _run_stages(ml_input, stages):
+    """Runs the named stages in the worker process; returns (results, per-stage seconds, readiness)."""
+    analyzer = _analyzer()
+    functions = {
+        "ml_trends": analyzer.detect_trends,
+        "ml_anomalies": analyzer.detect_anomalies,
+        "ml_clusters": analyzer.cluster_events,
+    }
+    results, timings = {}, {}
+    for name in stages:
+        started = time.perf_counter()
+        results[name] = functions[name](ml_input)
+        timings[name] = time.perf_counter() - started
+    return results, timings, analyzer.readiness()
+
+
+class AnalysisWorker:
+    def __init__(self, warm_up=None):
+        self.warm_up = os.getenv("ML_WARM_UP", "1") != "0" if warm_up is None else warm_up
+        self.generation = 0  # bumped whenever new results land
+        self.results = {name: [] for name in STAGES}
+        self.readiness = None
+        self.last_completed = None
+        self.last_duration = None
+        self.last_error = None
+        self._lock = threading.RLock()
+        self._pool = None
+        self._future = None
+        self._running = (None, frozenset())  # (data key, stages) of the run in progress
+        self._pending = None  # (key, ml_input, stages) for the newest data seen while a run was in progress
+        self._done = {}  # stage -> data key of its current result (or of its last failed run)
+
+    def request(self, key, ml_input, stages=STAGES):
+        """
+        Makes sure the results of `stages` for data version `key` exist or are
+        being computed. Never blocks.
+        """
+        with self._lock:
+            wanted = {name for name in stages if self._done.get(name) != key}
+            if self._running[0] == key:
+                wanted -= self._running[1]
+            if not wanted:
+                return
+            if self._future is not None:
+                if self._pending is not None:
+                    # Stages wanted for older data are still stale; bring them up to the newest
+                    wanted |= self._pending[2]
+                self._pending = (key, ml_input, wanted)
+                return
+            self._submit(key, ml_input, wanted)
+
+    def result(self, stage):
+        return self.results.get(stage, [])
+
+    def _submit(self, key, ml_input, stages):
+        if self._pool is None:
+            # spawn: forking a process that runs threads (collectors, the HTTP pool) isn't safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.warm_up,),
+            )
+        started = time.monotonic()
+        try:
+            future = self._pool.submit(_run_stages, ml_input, sorted(stages))
+        except (BrokenProcessPool, RuntimeError) as e:
+            logging.error(f"Analysis worker unavailable: {e}")
+            self.last_error = str(e)
+            self._done.update(dict.fromkeys(stages, key))
+            self._pool = None
+            return
+        self._future = future
+        self._running = (key, frozenset(stages))
+        future.add_done_callback(lambda f: self._finished(f, key, stages, started))
+
+    def _finished(self, future, key, stages, started):
+        error, broken = None, False
+        try:
+            results, timings, readiness = future.result()
+            for name, seconds in timings.items():
+                metrics.STAGE_SECONDS.observe(seconds, stage=name)
+        except Exception as e:
+            logging.error(f"Analysis run failed: {e!r}")
+            error = repr(e)
+            broken = isinstance(e, BrokenProcessPool)
+            metrics.STAGE_ERRORS.inc(stage="analysis_run")
+        metrics.STAGE_SECONDS.observe(time.monotonic() - started, stage="analysis_run")
+
+        with self._lock:
+            self._future = None
+            self._running = (None, frozenset())
+            self._done.update(dict.fromkeys(stages, key))  # a failed version isn't retried until the data changes
+            self.last_duration = round(time.monotonic() - started, 3)
+            self.last_error = error
+            if error is None:
+                self.results = dict(self.results, **results)
+                self.readiness = readiness
+                self.last_completed = datetime.utcnow().isoformat()
+                self.generation += 1
+            elif broken:
+                self._pool = None  # worker died (e.g. OOM); start a fresh one next time
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                wanted = {name for name in pending[2] if self._done.get(name) != pending[0]}
+                if wanted:
+                    self._submit(pending[0], pending[1], wanted)
+
+    def status(self):
+        with self._lock:
+            return {
+                "state": "running" if self._future is not None else ("idle" if self._pool else "not_started"),
+                "generation": self.generation,
+                "last_completed": self.last_completed,
+                "last_duration": self.last_duration,
+                "last_error": self.last_error,
+                "models": self.readiness,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
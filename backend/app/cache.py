@@ -0,0 +1,119 @@
+"""
+Snapshot-versioned cache for values derived from the collectors' output.
+
+Every collector publishes a ``<name>_latest.json`` file per feed. The set of
+those files together with their mtimes and sizes identifies one data version;
+anything derived from them (the overall indicators, the CSE overview, ...) is
+computed once per version and shared by every endpoint until a collector
+writes again.
+"""
+
+import glob
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    from backend.common import metrics
+except ImportError:
+    from common import metrics
+
+
+class SnapshotCache:
+    def __init__(self, base_dir, pattern="*/*_latest.json", max_entries=256, check_interval=1.0):
+        self.base_dir = base_dir
+        self.pattern = pattern
+        self.max_entries = max_entries
+        # Re-stat the snapshot files at most this often; a request touching many
+        # cached sections shouldn't glob the data directory for each of them
+        self.check_interval = check_interval
+        self._checked = (0.0, None)  # (monotonic time, data version)
+        # Extra callables whose value is part of the version, for derived data that
+        # changes without a file changing (e.g. background analysis results)
+        self.version_sources = []
+        self._lock = threading.Lock()
+        self._values = OrderedDict()  # key -> (version, value), least recently used first
+        self._inflight = {}  # (version, key) -> threading.Event
+
+    def version(self):
+        """Current data version: the snapshot files' fingerprint plus any version sources."""
+        if not self.version_sources:
+            return self.data_version()
+        return self.data_version() + tuple(fn() for fn in self.version_sources)
+
+    def data_version(self):
+        """Fingerprint of the latest snapshot files currently on disk."""
+        checked_at, version = self._checked
+        now = time.monotonic()
+        if version is not None and now - checked_at < self.check_interval:
+            return version
+        version = self._fingerprint()
+        self._checked = (now, version)
+        return version
+
+    def _fingerprint(self):
+        parts = []
+        for path in sorted(glob.glob(os.path.join(self.base_dir, self.pattern))):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            parts.append((os.path.relpath(path, self.base_dir), st.st_mtime_ns, st.st_size))
+        # Some derived values (e.g. upcoming holidays) depend on the current date
+        return (datetime.utcnow().strftime("%Y-%m-%d"), tuple(parts))
+
+    def get(self, key, compute):
+        """
+        Returns the value for `key` at the current data version, calling
+        `compute()` on a miss. Concurrent misses for the same key and version
+        wait on a single computation instead of each starting their own.
+        """
+        while True:
+            version = self.version()
+            with self._lock:
+                cached = self._values.get(key)
+                if cached is not None and cached[0] == version:
+                    self._values.move_to_end(key)
+                    metrics.CACHE_REQUESTS.inc(cache=self._kind(key), result="hit")
+                    return cached[1]
+                event = self._inflight.get((version, key))
+                owner = event is None
+                if owner:
+                    event = threading.Event()
+                    self._inflight[(version, key)] = event
+
+            metrics.CACHE_REQUESTS.inc(cache=self._kind(key), result="miss" if owner else "wait")
+            if not owner:
+                # Someone else is computing this version; re-check once they finish
+                # (if they failed, one of the waiters takes over).
+                event.wait()
+                continue
+
+            try:
+                value = compute()
+                with self._lock:
+                    self._values[key] = (version, value)
+                    self._values.move_to_end(key)
+                    # Keys can come from request parameters; keep the cache bounded
+                    while len(self._values) > self.max_entries:
+                        self._values.popitem(last=False)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop((version, key), None)
+                event.set()
+
+    @staticmethod
+    def _kind(key):
+        # "section:cse" / "response:signals:..." -> hit rates per kind of value
+        return key.split(":", 1)[0]
+
+    def __len__(self):
+        return len(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._checked = (0.0, None)
+            self._values.clear()
@@ -0,0 +1,152 @@
+"""
+Range queries over collector history for trend charts.
+
+Everything is answered from the time-series store (common/tsdb.py), never by
+globbing snapshot files. Bucketed resolutions read the precomputed rollups
+(one row per bucket), and `auto` picks the finest rollup that covers the
+window in a few times the requested number of points, then thins it with
+LTTB. A chart query therefore costs time proportional to the points it
+returns, not to the raw points stored.
+"""
+
+import os
+from datetime import datetime
+
+try:
+    from backend.common.deltas import SnapshotLog
+    from backend.common.downsample import lttb
+    from backend.common.snapshots import DATA_DIR
+    from backend.common.tsdb import ROLLUP_RESOLUTIONS, get_store, load_retention, retained_since, to_epoch
+except ImportError:
+    from common.deltas import SnapshotLog
+    from common.downsample import lttb
+    from common.snapshots import DATA_DIR
+    from common.tsdb import ROLLUP_RESOLUTIONS, get_store, load_retention, retained_since, to_epoch
+
+# Bucket width in seconds (None = raw points, "auto" = picked from the window and `points`)
+RESOLUTIONS = {"auto": "auto", "raw": None, **ROLLUP_RESOLUTIONS}
+RESOLUTION_ALIASES = {"minute": "1m", "15min": "15m", "hour": "1h", "hourly": "1h", "day": "1d", "daily": "1d"}
+
+# Window used when `from` is omitted, ending at `to` (or the series' newest point)
+DEFAULT_SPAN = {"auto": 30 * 86400, "raw": 86400, "1m": 86400, "15m": 7 * 86400, "1h": 30 * 86400, "1d": 365 * 86400}
+MAX_RAW_POINTS = 10000
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+# `auto` reads at most this many buckets per returned point before LTTB
+OVERSAMPLE = 4
+
+# CSE endpoints saved as change-detected snapshot logs (see cse_collector.py)
+CSE_SNAPSHOTS = ("prices", "gainers", "losers", "summary", "status", "indices")
+
+# Default metric and entity per source (see common/series.py for what is recorded)
+SOURCES = {
+    "cbsl": {"metric": "lkr_per_unit", "entity": "USD"},
+    "cse": {"metric": "price", "entity": None},
+    "cse_index": {"metric": "value", "entity": None},
+    "traffic": {"metric": "congestion_percent", "entity": "Colombo"},
+    "weather": {"metric": "temp", "entity": "Colombo"},
+    "news": {"metric": "headline_count", "entity": None},
+}
+
+
+class HistoryQueryError(ValueError):
+    pass
+
+
+def resolve_resolution(resolution):
+    resolution = (resolution or "auto").strip().lower()
+    resolution = RESOLUTION_ALIASES.get(resolution, resolution)
+    if resolution not in RESOLUTIONS:
+        raise HistoryQueryError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    return resolution
+
+
+def _epoch(value, name):
+    if value is None or value == "":
+        return None
+    try:
+        return to_epoch(float(value) if value.replace(".", "", 1).isdigit() else value)
+    except (TypeError, ValueError):
+        raise HistoryQueryError(f"'{name}' must be an ISO timestamp or epoch seconds")
+
+
+def auto_resolution(span, points, start=None):
+    """
+    Finest rollup whose bucket count over `span` seconds stays within
+    OVERSAMPLE * points and that is still kept back to `start` (see tsdb.prune).
+    """
+    retention = load_retention()
+    for name, width in ROLLUP_RESOLUTIONS.items():
+        since = retained_since(name, retention)
+        if span / width <= points * OVERSAMPLE and (start is None or since is None or start >= since):
+            return name
+    return name
+
+
+def query_history(source, entity=None, metric=None, start=None, end=None, resolution=None, points=None, store=None):
+    if source not in SOURCES:
+        raise HistoryQueryError(f"unknown source '{source}'; expected one of {', '.join(SOURCES)}")
+    store = store or get_store()
+    metric = metric or SOURCES[source]["metric"]
+    entity = entity or SOURCES[source]["entity"]
+    if not entity:
+        raise HistoryQueryError(f"'entity' is required for {source} (see /api/history/{source}/entities)")
+    resolution = resolve_resolution(resolution)
+    if points is not None and not 3 <= points <= MAX_POINTS:
+        raise HistoryQueryError(f"'points' must be between 3 and {MAX_POINTS}")
+
+    end_ts = _epoch(end, "to")
+    start_ts = _epoch(start, "from")
+    if end_ts is None:
+        end_ts = store.series_latest_ts(source, entity, metric)
+    if end_ts is not None and start_ts is None:
+        start_ts = end_ts - DEFAULT_SPAN[resolution]
+
+    result = {
+        "source": source,
+        "entity": entity,
+        "metric": metric,
+        "resolution": resolution,
+        "from": start_ts,
+        "to": end_ts,
+    }
+    if end_ts is None:
+        # Nothing recorded for this series yet
+        result.update(columns=["ts", "value"], points=[])
+        return result
+
+    if resolution == "auto":
+        points = points or DEFAULT_POINTS
+        resolution = result["resolution"] = auto_resolution(max(end_ts - start_ts, 0), points, start_ts)
+
+    bucket = RESOLUTIONS[resolution]
+    if bucket is None:
+        result["columns"] = ["ts", "value"]
+        rows = store.query(source, entity, metric, start=start_ts, end=end_ts, limit=MAX_RAW_POINTS)
+    else:
+        result["columns"] = ["ts", "mean", "min", "max", "last", "count"]
+        rows = store.rollup(source, entity, metric, bucket, start=start_ts, end=end_ts)
+    result["points"] = lttb(rows, points) if points else rows
+    return result
+
+
+def list_entities(source, metric=None, store=None):
+    if source not in SOURCES:
+        raise HistoryQueryError(f"unknown source '{source}'; expected one of {', '.join(SOURCES)}")
+    metric = metric or SOURCES[source]["metric"]
+    return {"source": source, "metric": metric, "entities": sorted((store or get_store()).entities(source, metric))}
+
+
+def cse_snapshot(name, at=None, data_dir=DATA_DIR):
+    """Full table of a CSE endpoint as of `at` (default: now), replayed from its keyframe and deltas."""
+    if name not in CSE_SNAPSHOTS:
+        raise HistoryQueryError(f"unknown CSE endpoint '{name}'; expected one of {', '.join(CSE_SNAPSHOTS)}")
+    at_ts = _epoch(at, "at")
+    when = datetime.utcfromtimestamp(at_ts) if at_ts is not None else datetime.utcnow()
+    path, rows = SnapshotLog(os.path.join(data_dir, "cse"), name).at(when)
+    return {
+        "endpoint": name,
+        "at": when.isoformat(),
+        "snapshot": os.path.basename(path) if path else None,
+        "rows": rows or [],
+    }
@@ -0,0 +1,182 @@
+"""
+Single collector leader for multi-worker deployments.
+
+Exactly one process runs the collectors: whoever holds an exclusive lock on
+``data/collectors.lock``. With ``uvicorn --workers N`` the first worker to
+start takes it (the others keep retrying, so a crashed leader is replaced);
+alternatively run ``python -m backend.collectors`` as its own service and
+start the API with ``COLLECTOR_MODE=off``.
+
+Every other process is a read-only consumer: it never fetches, never writes
+snapshot files or the time-series store, and notices new data through the
+snapshot files' generations (see common/snapshots.py). The leader publishes
+its scheduler status to ``data/collectors_status.json`` for their /health.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    from backend.common import backfill, jsonio
+    from backend.common.snapshots import DATA_DIR, atomic_write
+    from backend.common.tsdb import get_store
+except ImportError:
+    from common import backfill, jsonio
+    from common.snapshots import DATA_DIR, atomic_write
+    from common.tsdb import get_store
+
+from .scheduler import CollectorScheduler
+
+LOCK_PATH = os.path.join(DATA_DIR, "collectors.lock")
+STATUS_PATH = os.path.join(DATA_DIR, "collectors_status.json")
+RETRY_SECONDS = 30
+
+# auto: the worker holding the lock runs the collectors (default)
+# off:  this process never collects (collectors run via `python -m backend.collectors`)
+COLLECTOR_MODES = ("auto", "off")
+
+
+def collector_mode():
+    mode = os.getenv("COLLECTOR_MODE", "auto").strip().lower()
+    if mode not in COLLECTOR_MODES:
+        logging.warning("Unknown COLLECTOR_MODE %r; using 'auto'", mode)
+        return "auto"
+    return mode
+
+
+class LeaderLock:
+    """Non-blocking exclusive flock; released by the OS if the holder dies."""
+
+    def __init__(self, path=LOCK_PATH):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self):
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            # No flock (Windows): assume a single process
+            self._fd = -1
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+
+def write_status(scheduler, path=STATUS_PATH):
+    status = {
+        "leader_pid": os.getpid(),
+        "updated": datetime.utcnow().isoformat(),
+        "collectors": scheduler.status(),
+    }
+    try:
+        atomic_write(path, jsonio.dumps(status))
+    except Exception as e:
+        logging.error(f"Failed to write collector status: {e}")
+
+
+def read_status(path=STATUS_PATH):
+    try:
+        return jsonio.load_file(path)
+    except (OSError, ValueError):
+        return None
+
+
+def seed_history():
+    """Imports the snapshot files on disk into an empty time-series store (leader only)."""
+    store = get_store()
+    if store.latest_ts("cse") is None:
+        files, points = backfill.import_backlog(backfill.DEFAULT_DATA_DIR, store)
+        logging.info("Seeded the time-series store with %s points from %s files", points, files)
+
+
+class CollectorLeader:
+    """Runs the collector scheduler in this process once it holds the leader lock."""
+
+    def __init__(self, scheduler=None, lock=None):
+        self.lock = lock or LeaderLock()
+        self.scheduler = scheduler or CollectorScheduler()
+        self.scheduler.on_run = lambda job: write_status(self.scheduler)
+        self._task = None
+
+    @property
+    def is_leader(self):
+        return self.lock.held
+
+    def start(self):
+        """Starts competing for leadership in the background."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._claim())
+
+    async def _claim(self):
+        while not self.lock.acquire():
+            await asyncio.sleep(RETRY_SECONDS)
+        logging.info("Process %d is the collector leader", os.getpid())
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, seed_history)
+        except Exception as e:
+            logging.error(f"Seeding the time-series store failed: {e}")
+        write_status(self.scheduler)
+        self.scheduler.start()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.scheduler.stop()
+        self.lock.release()
+
+    def status(self):
+        """Collector status as seen from this process (the leader's, read from disk if elsewhere)."""
+        if self.is_leader:
+            return {"leader_pid": os.getpid(), "collectors": self.scheduler.status()}
+        return read_status() or {"leader_pid": None, "collectors": {}}
+
+
+async def run_standalone():
+    """Entry point of `python -m backend.collectors`: lead until SIGINT/SIGTERM."""
+    leader = CollectorLeader()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows; Ctrl+C still raises KeyboardInterrupt
+    if not leader.lock.acquire():
+        logging.info("Another process holds %s; waiting to take over", leader.lock.path)
+    leader.start()
+    try:
+        await stop.wait()
+    finally:
+        await leader.stop()
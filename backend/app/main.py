@@ -1,41 +1,58 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from .processors import build_overall_indicators, get_cse_overview
-import threading
-import subprocess
-import time
-import sys
+from fastapi.responses import StreamingResponse, Response
+import asyncio
 import os
-from pathlib import Path
-
-app = FastAPI(title="Situational Awareness API")
-
-# Calculate absolute path to collectors directory
-# Relative to this file (app/main.py), collectors are in ../collectors
-BASE_DIR = Path(__file__).resolve().parent.parent
-COLLECTORS_DIR = BASE_DIR / "collectors"
-
-def run_collectors_loop():
-    """Runs data collectors in a background loop every 5 minutes."""
-    while True:
-        try:
-            print(f"Running collectors from {COLLECTORS_DIR}...")
-            subprocess.run([sys.executable, str(COLLECTORS_DIR / "traffic_collector.py")])
-            subprocess.run([sys.executable, str(COLLECTORS_DIR / "cbsl_collector.py")])
-            subprocess.run([sys.executable, str(COLLECTORS_DIR / "events_collector.py")])
-            subprocess.run([sys.executable, str(COLLECTORS_DIR / "cse_collector.py")])
-            subprocess.run([sys.executable, str(COLLECTORS_DIR / "news_collector.py")])
-            subprocess.run([sys.executable, str(COLLECTORS_DIR / "weather_collector.py")])
-            print("Collectors finished. Sleeping for 5 minutes.")
-        except Exception as e:
-            print(f"Error running collectors: {e}")
-        time.sleep(300)
+import time
+from .processors import get_overall_indicators, get_cse_overview_cached, get_price_table, snapshot_cache, analysis, start_analysis
+from .responses import FastJSONResponse, conditional_response, serialize
+from .projection import parse_fields, top_level, project, sort_rows, page
+from .history import HistoryQueryError, cse_snapshot, list_entities, query_history
+from .leader import CollectorLeader, collector_mode
+from .stream import SnapshotBroadcaster
+
+try:
+    from backend.common import metrics
+except ImportError:
+    from common import metrics
+
+app = FastAPI(title="Situational Awareness API", default_response_class=FastJSONResponse)
+
+# Collectors run in exactly one process: the worker holding the leader lock, or a
+# separate `python -m backend.collectors` service with COLLECTOR_MODE=off here (see leader.py)
+leader = CollectorLeader()
+
+def dashboard_snapshot():
+    """Everything the dashboard polls for, in one payload for the push channel."""
+    return {
+        "signals": project(signals_payload(signal_sections(SLIM_SIGNALS)), SLIM_SIGNALS),
+        "risk": risk_payload(),
+        "opportunities": opportunities_payload(),
+        "market": market_payload(fields=["status", "gainers", "losers"]),
+    }
+
+# Pushes a new dashboard snapshot to /api/stream clients whenever the data changes
+broadcaster = SnapshotBroadcaster(snapshot_cache.version, dashboard_snapshot)
+
+metrics.registry.gauge("sa_stream_clients", "Connected /api/stream clients",
+                       fn=lambda: {(): broadcaster.client_count})
+metrics.registry.gauge("sa_snapshot_cache_entries", "Values held by the snapshot cache",
+                       fn=lambda: {(): len(snapshot_cache)})
 
 @app.on_event("startup")
-def startup_event():
-    # Start collectors in a background thread
-    thread = threading.Thread(target=run_collectors_loop, daemon=True)
-    thread.start()
+async def startup_event():
+    if collector_mode() == "auto":
+        leader.start()
+    broadcaster.start()
+    # First analysis run starts now, in the analysis worker process; it also loads the
+    # models there unless ML_WARM_UP=0 (see /health "ml")
+    asyncio.get_running_loop().run_in_executor(None, start_analysis)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await broadcaster.stop()
+    await leader.stop()
+    analysis.shutdown()
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,13 +61,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template, not the raw path, so query strings and ids don't explode the label set
+        route = request.scope.get("route")
+        metrics.API_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+
 @app.get("/health")
 def health():
-    return {"status": "ok", "time": __import__("datetime").datetime.utcnow().isoformat()}
+    collectors = leader.status()
+    return {
+        "status": "ok",
+        "time": __import__("datetime").datetime.utcnow().isoformat(),
+        "pid": os.getpid(),
+        "collector_leader_pid": collectors.get("leader_pid"),
+        "collectors": collectors.get("collectors", {}),
+        "stream_clients": broadcaster.client_count,
+        "ml": analysis.status(),
+    }
 
-@app.get("/api/signals")
-def signals():
-    indicators = build_overall_indicators()
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of the stage, upstream, collector, file and cache metrics."""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+def cached_json(request, name, build):
+    """Serves `build()` serialized once per data version, with ETag / 304 support."""
+    payload = snapshot_cache.get(f"response:{name}", lambda: serialize(build()))
+    return conditional_response(request, payload)
+
+# Fields the dashboard actually renders; `?view=slim` on /api/signals
+SLIM_SIGNALS = [
+    "national_activity_score", "market_volatility_percent", "risk_score", "opportunity_score",
+    "raw_counts", "trends", "anomalies", "clusters",
+    "traffic.raw", "cbsl.raw.rates", "weather.summaries", "events.upcoming", "news.latest",
+]
+SIGNAL_VIEWS = {"slim": SLIM_SIGNALS, "full": None}
+
+# Aliases added by signals_payload() and the indicator sections they need
+SIGNAL_ALIASES = {
+    "raw_counts": ["news", "weather", "cse"],
+    "trends": ["ml_trends"],
+    "anomalies": ["ml_anomalies"],
+    "clusters": ["ml_clusters"],
+}
+
+def signal_sections(paths):
+    """Indicator sections needed to answer the given field paths (None = all)."""
+    if paths is None:
+        return None
+    sections = []
+    for key in sorted(top_level(paths)):
+        for name in SIGNAL_ALIASES.get(key, [key]):
+            if name not in sections:
+                sections.append(name)
+    return sections
+
+def signals_payload(sections=None):
+    # Shallow copy: the cached indicator sections are shared with the other endpoints
+    indicators = dict(get_overall_indicators(sections))
     # Ensure frontend compatibility by adding expected fields if missing
     # Frontend expects: raw_counts, trends, anomalies in 'signals' endpoint? 
     # Actually frontend calls /signals, /risk, /opportunities separately.
@@ -58,20 +139,21 @@ def signals():
     # For now, I will keep this returning the full object, and add the specific endpoints below.
     
     # Add fields expected by frontend's Dashboard.tsx for 'signals' state
-    indicators["raw_counts"] = {
-        "news": indicators["news"]["headline_count"],
-        "weather_alerts": len(indicators["weather"]["alerts"]),
-        "cse_gainers": indicators["cse"]["gainers_count"]
-    }
-    indicators["trends"] = indicators.get("ml_trends", [])
-    indicators["anomalies"] = indicators.get("ml_anomalies", [])
-    indicators["clusters"] = indicators.get("ml_clusters", [])
+    if all(k in indicators for k in SIGNAL_ALIASES["raw_counts"]):
+        indicators["raw_counts"] = {
+            "news": indicators["news"]["headline_count"],
+            "weather_alerts": len(indicators["weather"]["alerts"]),
+            "cse_gainers": indicators["cse"]["gainers_count"]
+        }
+    for alias in ("trends", "anomalies", "clusters"):
+        section = SIGNAL_ALIASES[alias][0]
+        if section in indicators:
+            indicators[alias] = indicators[section]
 
     return indicators
 
-@app.get("/api/risk")
-def get_risk():
-    data = build_overall_indicators()
+def risk_payload():
+    data = get_overall_indicators()
     factors = data["weather"]["alerts"][:]
     if data["market_volatility_percent"] > 60:
         factors.append(f"High Market Stress ({data['market_volatility_percent']:.0f}%)")
@@ -85,9 +167,8 @@ def get_risk():
         "factors": factors
     }
 
-@app.get("/api/opportunities")
-def get_opportunities():
-    data = build_overall_indicators()
+def opportunities_payload():
+    data = get_overall_indicators()
     factors = []
     if data["opportunity_score"] > 50:
         factors.append("Favorable Market Conditions")
@@ -96,16 +177,133 @@ def get_opportunities():
         "factors": factors
     }
 
+MARKET_FIELDS = ["summary", "status", "gainers", "losers", "prices", "sectors"]
+
+def market_payload(fields=None, sort=None, offset=0, limit=None, symbols=None):
+    data = get_cse_overview_cached()
+    fields = [k for k in (fields or MARKET_FIELDS) if k in MARKET_FIELDS]
+    payload = {k: data.get(k) for k in fields if k != "sectors"}
+    if "sectors" in fields:
+        payload["sectors"] = get_price_table().sectors()
+    if "prices" in payload:
+        prices = payload["prices"] or []
+        table = get_price_table()
+        field = (sort or "").lstrip("-+")
+        if symbols:
+            # Symbol index lookup instead of a scan
+            payload["prices"] = table.lookup(symbols)
+        elif sort and table.sortable(field):
+            # Cached column order: O(limit) per request
+            payload["prices"] = table.top(field, limit, offset, descending=sort.startswith("-"))
+        elif sort or offset or limit is not None:
+            payload["prices"] = page(sort_rows(prices, sort), offset, limit)
+        if symbols or sort or offset or limit is not None:
+            payload["prices_total"] = len(prices)
+    return payload
+
+@app.get("/api/signals")
+def signals(request: Request, fields: str = None, view: str = None):
+    """`fields` takes comma-separated dotted paths; `view=slim` is the dashboard's subset."""
+    paths = parse_fields(fields, view, SIGNAL_VIEWS)
+    if paths is None:
+        return cached_json(request, "signals", signals_payload)
+    return cached_json(
+        request,
+        "signals:" + ",".join(paths),
+        lambda: project(signals_payload(signal_sections(paths)), paths),
+    )
+
+@app.get("/api/risk")
+def get_risk(request: Request):
+    return cached_json(request, "risk", risk_payload)
+
+@app.get("/api/opportunities")
+def get_opportunities(request: Request):
+    return cached_json(request, "opportunities", opportunities_payload)
+
 @app.get("/api/market")
-def get_market_data():
-    data = get_cse_overview()
-    return {
-        "summary": data.get("summary"),
-        "status": data.get("status"),
-        "gainers": data.get("gainers"),
-        "losers": data.get("losers"),
-        "prices": data.get("prices", [])
-    }
+def get_market_data(
+    request: Request,
+    fields: str = None,
+    sort: str = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(None, ge=0),
+    symbol: str = None,
+):
+    """
+    `sort=-changePercentage&limit=10` or `sort=-turnover&limit=20` gives a top-N;
+    `symbol=JKH.N0000` (comma-separated for several) looks prices up by symbol;
+    `fields` takes comma-separated dotted paths, as in /api/signals, under the
+    top-level keys in MARKET_FIELDS (`sectors` is a per-sector summary).
+    """
+    selected = parse_fields(fields)
+    if selected:
+        unknown = sorted(top_level(selected) - set(MARKET_FIELDS))
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown market fields: {', '.join(unknown)} (expected {', '.join(MARKET_FIELDS)})",
+            )
+    symbols = [s.strip().upper() for s in symbol.split(",") if s.strip()] if symbol else None
+    key = (f"market:{','.join(selected or [])}:{sort or ''}:{offset}:{'' if limit is None else limit}"
+           f":{','.join(symbols or [])}")
+
+    def build():
+        payload = market_payload(sorted(top_level(selected)) if selected else None, sort, offset, limit, symbols)
+        if selected and any("." in p for p in selected):
+            payload = project(payload, selected + ["prices_total"])
+        return payload
+
+    return cached_json(request, key, build)
+
+@app.get("/api/market/snapshot/{name}")
+def get_market_snapshot(request: Request, name: str, at: str = None):
+    """A CSE endpoint's table as it was at `at` (ISO or epoch seconds), rebuilt from its delta log."""
+    try:
+        return cached_json(request, f"market-snapshot:{name}:{at}", lambda: cse_snapshot(name, at))
+    except HistoryQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/history/{source}")
+def get_history(
+    request: Request,
+    source: str,
+    entity: str = None,
+    metric: str = None,
+    start: str = Query(None, alias="from"),
+    end: str = Query(None, alias="to"),
+    resolution: str = "auto",
+    points: int = None,
+):
+    """
+    Downsampled series from the time-series store, e.g.
+    /api/history/cbsl?entity=USD&points=300 or /api/history/traffic?entity=Colombo&resolution=15m.
+    `from`/`to` take ISO timestamps or epoch seconds; the default window ends at the newest point.
+    `points` caps the result with LTTB downsampling (resolution=auto defaults to 500).
+    """
+    key = f"history:{source}:{entity}:{metric}:{start}:{end}:{resolution}:{points}"
+    try:
+        return cached_json(
+            request, key, lambda: query_history(source, entity, metric, start, end, resolution, points)
+        )
+    except HistoryQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/history/{source}/entities")
+def get_history_entities(request: Request, source: str, metric: str = None):
+    try:
+        return cached_json(request, f"history-entities:{source}:{metric}", lambda: list_entities(source, metric))
+    except HistoryQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/stream")
+async def stream(request: Request):
+    """Server-Sent Events: one `snapshot` event per data version, replacing polling."""
+    return StreamingResponse(
+        broadcaster.events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/")
 def root():
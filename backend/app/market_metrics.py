@@ -0,0 +1,252 @@
+"""
+Market breadth, returns, realized volatility and dispersion for the CSE.
+
+The engine works on the full price table (see market_table.py), not on the
+top-N gainer/loser lists. On each new price tick it:
+
+- computes breadth, turnover-weighted and equal-weighted returns and
+  cross-sectional / per-sector dispersion with NumPy over all rows.
+- adds every symbol's squared log return since its previous tick to a
+  per-symbol accumulator for the Colombo trading day. Realized intraday
+  volatility is then a square root, not a rescan of the day's history.
+
+The accumulators are seeded once per day from the time-series store, so a
+restarted API process picks up the day so far. After that a tick costs one
+vectorized pass over the current symbols, however much history is stored.
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+
+try:
+    from backend.common.cse_schedule import COLOMBO_OFFSET
+    from backend.common.tsdb import get_store, to_epoch
+except ImportError:
+    from common.cse_schedule import COLOMBO_OFFSET
+    from common.tsdb import get_store, to_epoch
+
+# Scales for the 0-100 market stress figure: these levels count as maximal stress
+STRESS_VOLATILITY_PCT = 3.0
+STRESS_DISPERSION_PCT = 5.0
+
+
+def _round(value, digits=4):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def _trading_day(ts):
+    """Colombo calendar date of an epoch timestamp."""
+    return (datetime.utcfromtimestamp(ts) + COLOMBO_OFFSET).date()
+
+
+def _day_start(day):
+    return int((datetime(day.year, day.month, day.day) - COLOMBO_OFFSET - datetime(1970, 1, 1)).total_seconds())
+
+
+def _group_std(codes, values, n):
+    """Population standard deviation of `values` per group code (NaNs ignored)."""
+    known = np.isfinite(values)
+    x = np.where(known, values, 0.0)
+    count = np.bincount(codes, weights=known, minlength=n)
+    total = np.bincount(codes, weights=x, minlength=n)
+    squares = np.bincount(codes, weights=x * x, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        var = np.maximum(squares / count - mean * mean, 0.0)
+    return np.sqrt(var), mean, count
+
+
+class MarketMetrics:
+    def __init__(self, store=None):
+        self._store = store
+        self._lock = threading.Lock()
+        self._absorbed = None  # price table state already folded into the accumulators
+        self.day = None
+        self.ticks = 0
+        self._slots = {}  # symbol -> accumulator position
+        self._last_price = np.empty(0)
+        self._sum_sq = np.empty(0)
+        self._returns = np.empty(0)
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def _grow(self, size):
+        extra = size - len(self._last_price)
+        if extra > 0:
+            self._last_price = np.concatenate([self._last_price, np.full(extra, np.nan)])
+            self._sum_sq = np.concatenate([self._sum_sq, np.zeros(extra)])
+            self._returns = np.concatenate([self._returns, np.zeros(extra)])
+
+    def _positions(self, symbols):
+        slots = self._slots
+        positions = np.fromiter((slots.setdefault(s, len(slots)) for s in symbols), dtype=np.int64, count=len(symbols))
+        self._grow(len(slots))
+        return positions
+
+    def _reset(self, day):
+        self.day = day
+        self.ticks = 0
+        self._slots = {}
+        self._last_price = np.empty(0)
+        self._sum_sq = np.empty(0)
+        self._returns = np.empty(0)
+
+    def _seed(self, day, until):
+        """Folds the day's stored price history (up to `until`) into fresh accumulators."""
+        self._reset(day)
+        try:
+            rows = self.store.query_source("cse", "price", start=_day_start(day), end=until)
+        except Exception as e:
+            logging.warning(f"Could not seed intraday volatility from history: {e}")
+            return
+        if not rows:
+            return
+        entities = np.array([r[0] for r in rows], dtype=object)
+        ts = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        prices = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+        names, codes = np.unique(entities, return_inverse=True)
+        positions = self._positions(names)
+        # Rows come ordered by entity, then time: consecutive rows of one symbol are its ticks
+        same = codes[1:] == codes[:-1]
+        valid = same & (prices[1:] > 0) & (prices[:-1] > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.where(valid, np.log(prices[1:] / prices[:-1]), 0.0)
+        group = positions[codes[1:]]
+        np.add.at(self._sum_sq, group, r * r)
+        np.add.at(self._returns, group, valid)
+        last = np.r_[~same, True]  # last row of each symbol
+        self._last_price[positions[codes[last]]] = prices[last]
+        self.ticks = len(np.unique(ts))
+
+    def _absorb(self, state, tick_ts):
+        day = _trading_day(tick_ts)
+        if day != self.day:
+            # New trading day (or first tick since start): the store already holds this tick
+            self._seed(day, tick_ts)
+            return
+        prices = state.columns["lastTradedPrice"]
+        positions = self._positions(state.symbols)
+        previous = self._last_price[positions]
+        valid = np.isfinite(prices) & (prices > 0) & np.isfinite(previous) & (previous > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.where(valid, np.log(prices / previous), 0.0)
+        self._sum_sq[positions] += r * r
+        self._returns[positions] += valid
+        known = np.isfinite(prices) & (prices > 0)
+        self._last_price[positions[known]] = prices[known]
+        self.ticks += 1
+
+    def update(self, table, now=None):
+        """Folds the table's current load in as one tick, unless it was already seen."""
+        state = table.state
+        with self._lock:
+            if state is self._absorbed:
+                return
+            fetched_at = state.rows[0].get("fetched_at_utc") if state.rows else None
+            try:
+                tick_ts = to_epoch(fetched_at) if fetched_at else to_epoch(now)
+            except ValueError:
+                tick_ts = to_epoch(now)
+            if state.rows:
+                self._absorb(state, tick_ts)
+            self._absorbed = state
+
+    def realized_volatility(self, symbols):
+        """Per-symbol realized intraday volatility in percent (NaN where no return was seen today)."""
+        positions = np.fromiter((self._slots.get(s, -1) for s in symbols), dtype=np.int64, count=len(symbols))
+        vol = np.full(len(symbols), np.nan)
+        seen = positions >= 0
+        measured = seen.copy()
+        measured[seen] = self._returns[positions[seen]] > 0
+        vol[measured] = np.sqrt(self._sum_sq[positions[measured]]) * 100
+        return vol
+
+    def compute(self, table):
+        """Breadth, returns, volatility and dispersion for the table's current load."""
+        self.update(table)
+        state = table.state
+        n = len(state.rows)
+        if n == 0:
+            return {"symbols": 0}
+        change = state.columns["changePercentage"]
+        turnover = np.nan_to_num(state.columns["turnover"])
+        known = np.isfinite(change)
+
+        advancers = int(np.count_nonzero(change > 0))
+        decliners = int(np.count_nonzero(change < 0))
+        unchanged = int(np.count_nonzero(change == 0))
+        moved = advancers + decliners
+
+        weights = np.where(known, turnover, 0.0)
+        weighted = float(np.dot(weights, np.where(known, change, 0.0)) / weights.sum()) if weights.sum() > 0 else np.nan
+        equal = float(change[known].mean()) if known.any() else np.nan
+
+        with self._lock:
+            vol = self.realized_volatility(state.symbols)
+            ticks = self.ticks
+        measured = np.isfinite(vol)
+        vol_median = float(np.median(vol[measured])) if measured.any() else np.nan
+        vol_weights = turnover[measured]
+        vol_weighted = float(np.dot(vol_weights, vol[measured]) / vol_weights.sum()) if vol_weights.sum() > 0 else vol_median
+
+        n_sectors = len(state.sector_names)
+        sector_std, sector_mean, sector_count = _group_std(state.sector_codes, change, n_sectors)
+        sectors = sorted(
+            (
+                {
+                    "sector": str(state.sector_names[k]),
+                    "count": int(sector_count[k]),
+                    "mean_change_pct": _round(sector_mean[k]),
+                    "dispersion_pct": _round(sector_std[k]),
+                }
+                for k in range(n_sectors)
+            ),
+            key=lambda s: -(s["dispersion_pct"] or 0),
+        )
+        cross_section = float(change[known].std()) if known.any() else np.nan
+
+        return {
+            "symbols": n,
+            "breadth": {
+                "advancers": advancers,
+                "decliners": decliners,
+                "unchanged": unchanged,
+                "advance_decline_ratio": _round(advancers / decliners) if decliners else None,
+                "net_breadth_pct": _round((advancers - decliners) / moved * 100, 2) if moved else 0.0,
+                "decliner_share_pct": _round(decliners / moved * 100, 2) if moved else 0.0,
+            },
+            "returns": {
+                "turnover_weighted_pct": _round(weighted),
+                "equal_weighted_pct": _round(equal),
+                "turnover": _round(turnover.sum(), 2),
+            },
+            "volatility": {
+                "realized_intraday_pct": _round(vol_median),
+                "turnover_weighted_pct": _round(vol_weighted),
+                "symbols_measured": int(measured.sum()),
+                "ticks_today": ticks,
+            },
+            "dispersion": {
+                "cross_section_pct": _round(cross_section),
+                "sectors": sectors,
+            },
+            "stress_percent": self.stress(decliners, moved, vol_weighted, cross_section),
+        }
+
+    @staticmethod
+    def stress(decliners, moved, volatility, dispersion):
+        """0-100: half decliner share, then realized volatility and dispersion against their scales."""
+        parts = [(0.5, decliners / moved if moved else np.nan)]
+        if np.isfinite(volatility):
+            parts.append((0.3, min(1.0, volatility / STRESS_VOLATILITY_PCT)))
+        if np.isfinite(dispersion):
+            parts.append((0.2, min(1.0, dispersion / STRESS_DISPERSION_PCT)))
+        parts = [(w, v) for w, v in parts if np.isfinite(v)]
+        if not parts:
+            return 0.0
+        return round(100 * sum(w * v for w, v in parts) / sum(w for w, _ in parts), 2)
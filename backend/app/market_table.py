@@ -0,0 +1,181 @@
+"""
+Columnar, typed in-memory table of the latest CSE share prices.
+
+`prices_latest.json` is a list of dicts; answering "JKH.N0000's price" or
+"top 20 by turnover" from it means scanning every row. `PriceTable` loads
+the list once per published generation:
+
+- numeric fields go into float64 NumPy columns (missing values become NaN).
+- a symbol -> row index serves lookups in O(1).
+- per-column sort orders are computed once per load and cached, so a top-N or
+  a page of a ranking is O(k).
+- a sector summary is one vectorized group-by.
+
+The table is swapped as a whole on refresh, so a reader never sees a
+half-loaded state.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+try:
+    from backend.common import jsonio
+    from backend.common.snapshots import DATA_DIR
+except ImportError:
+    from common import jsonio
+    from common.snapshots import DATA_DIR
+
+NUMERIC_COLUMNS = (
+    "lastTradedPrice", "open", "high", "low", "change", "changePercentage",
+    "crossingVolume", "quantity", "turnover", "tradesTime",
+)
+UNCLASSIFIED = "Unclassified"
+
+# Optional {symbol: sector} map. The price feed carries no sector, so without
+# this file (or a "sector" field in the rows) every symbol is Unclassified.
+SECTORS_PATH = os.path.join(DATA_DIR, "cse", "sectors.json")
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def load_sector_map(path=SECTORS_PATH):
+    try:
+        sectors = jsonio.load_file(path)
+    except (OSError, ValueError):
+        return {}
+    return sectors if isinstance(sectors, dict) else {}
+
+
+class _State:
+    """One immutable load of the table."""
+
+    def __init__(self, rows, sector_map):
+        self.source = rows
+        self.rows = []
+        for row in rows:
+            if not isinstance(row, dict) or not row.get("symbol"):
+                continue
+            if row.get("turnover") is None:
+                # Not in todaySharePrice; approximated from the last price and the day's volume
+                price, volume = _float(row.get("lastTradedPrice")), _float(row.get("crossingVolume"))
+                row = dict(row, turnover=None if np.isnan(price * volume) else price * volume)
+            self.rows.append(row)
+        self.symbols = np.array([row["symbol"] for row in self.rows], dtype=object)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.columns = {
+            name: np.fromiter((_float(row.get(name)) for row in self.rows), dtype=np.float64, count=len(self.rows))
+            for name in NUMERIC_COLUMNS
+        }
+        sectors = [row.get("sector") or sector_map.get(row["symbol"]) or UNCLASSIFIED for row in self.rows]
+        self.sector_names, self.sector_codes = np.unique(np.array(sectors, dtype=object), return_inverse=True)
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def order(self, column, descending):
+        """(row positions sorted by `column`, each row's position in that order); NaNs last."""
+        key = (column, descending)
+        cached = self._orders.get(key)
+        if cached is None:
+            values = self.columns[column]
+            missing = np.isnan(values)
+            # Sort the negated values for descending order so ties keep their feed order
+            ranked = np.argsort(-values if descending else values, kind="stable")
+            order = np.concatenate([ranked[~missing[ranked]], ranked[missing[ranked]]])
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            cached = (order, inverse)
+            with self._lock:
+                self._orders[key] = cached
+        return cached
+
+
+class PriceTable:
+    def __init__(self, sectors_path=SECTORS_PATH):
+        self.sectors_path = sectors_path
+        self._state = _State([], {})
+
+    def __len__(self):
+        return len(self._state.rows)
+
+    @property
+    def state(self):
+        """The current load (rows, symbols, index, columns, sector codes); never modified once built."""
+        return self._state
+
+    def refresh(self, rows):
+        """Reloads from `rows` (the parsed prices_latest.json) unless it is the list already loaded."""
+        state = self._state
+        rows = rows if isinstance(rows, list) else []
+        if rows is state.source:
+            return False
+        self._state = _State(rows, load_sector_map(self.sectors_path))
+        return True
+
+    def get(self, symbol):
+        state = self._state
+        i = state.index.get(symbol)
+        return state.rows[i] if i is not None else None
+
+    def lookup(self, symbols):
+        """Rows for the given symbols, in the order asked, skipping unknown ones."""
+        state = self._state
+        return [state.rows[state.index[s]] for s in symbols if s in state.index]
+
+    def sortable(self, column):
+        return column in NUMERIC_COLUMNS
+
+    def top(self, column, limit=None, offset=0, descending=True):
+        """Rows ranked by a numeric column, `offset` .. `offset + limit`."""
+        state = self._state
+        order, _ = state.order(column, descending)
+        stop = None if limit is None else offset + limit
+        return [state.rows[i] for i in order[offset:stop]]
+
+    def rank(self, symbol, column="changePercentage", descending=True):
+        """1-based position of `symbol` in the ranking by `column`, or None."""
+        state = self._state
+        i = state.index.get(symbol)
+        if i is None or np.isnan(state.columns[column][i]):
+            return None
+        return int(state.order(column, descending)[1][i]) + 1
+
+    def sectors(self):
+        """Per-sector count, turnover, volume, mean % change and advancers/decliners."""
+        state = self._state
+        if not state.rows:
+            return []
+        codes, n = state.sector_codes, len(state.sector_names)
+
+        def total(values):
+            return np.bincount(codes, weights=np.nan_to_num(values), minlength=n)
+
+        change = state.columns["changePercentage"]
+        known = ~np.isnan(change)
+        counts = np.bincount(codes, minlength=n)
+        changed = np.bincount(codes, weights=known, minlength=n)
+        mean_change = np.divide(total(change), changed, out=np.full(n, np.nan), where=changed > 0)
+        turnover = total(state.columns["turnover"])
+        volume = total(state.columns["crossingVolume"])
+        advancers = np.bincount(codes, weights=change > 0, minlength=n)
+        decliners = np.bincount(codes, weights=change < 0, minlength=n)
+
+        summary = [
+            {
+                "sector": str(state.sector_names[k]),
+                "count": int(counts[k]),
+                "turnover": float(turnover[k]),
+                "volume": float(volume[k]),
+                "mean_change_pct": None if np.isnan(mean_change[k]) else round(float(mean_change[k]), 4),
+                "advancers": int(advancers[k]),
+                "decliners": int(decliners[k]),
+            }
+            for k in range(n)
+        ]
+        return sorted(summary, key=lambda s: s["turnover"], reverse=True)
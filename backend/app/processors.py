@@ -1,27 +1,44 @@
 import os
-import json
-import pandas as pd
 from datetime import datetime
-import logging
 try:
-    from backend.ml_engine.analyzer import detect_trends, detect_anomalies, cluster_events
+    from backend.common import metrics
+    from backend.common.snapshots import SnapshotReader
 except ImportError:
-    from ml_engine.analyzer import detect_trends, detect_anomalies, cluster_events
+    from common import metrics
+    from common.snapshots import SnapshotReader
+from .analysis import STAGES, AnalysisWorker
+from .cache import SnapshotCache
+from .market_metrics import MarketMetrics
+from .market_table import PriceTable
 
 # Adjusted base path to match my project structure
 # Adjusted base path to match my project structure
 BASE = os.path.join(os.path.dirname(__file__), "..", "data")
 
+# Derived values are computed once per collector cycle and shared by all endpoints
+snapshot_cache = SnapshotCache(BASE)
+
+# ML stages run in a separate process; landing results is a new data version too
+analysis = AnalysisWorker()
+snapshot_cache.version_sources.append(lambda: analysis.generation)
+
+# Latest files are parsed once per published generation (see common/snapshots.py)
+snapshot_reader = SnapshotReader(BASE)
+
+# Columnar view of prices_latest.json, reloaded when the collector publishes
+price_table = PriceTable()
+# Breadth/volatility/dispersion over the full table, accumulated per price tick
+market_metrics = MarketMetrics()
+
 def read_latest_json(category, filename):
-    path = os.path.join(BASE, category, filename)
-    if not os.path.exists(path):
-        return None
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        logging.error(f"Error reading {path}: {e}")
-        return None
+    return snapshot_reader.read(f"{category}/{filename}")
+
+def get_price_table():
+    price_table.refresh(read_latest_json("cse", "prices_latest.json"))
+    return price_table
+
+def get_market_metrics():
+    return market_metrics.compute(get_price_table())
 
 def get_cse_overview():
     # read latest summary/status/prices JSON saved by collector
@@ -181,32 +198,22 @@ def get_events_overview():
             
     return {"upcoming": upcoming, "count": len(holidays)}
 
-def build_overall_indicators():
-    cse = get_cse_overview()
-    news = get_news_overview()
-    weather = get_weather_overview()
-    traffic = get_traffic_overview()
-    cbsl = get_cbsl_overview()
-    events = get_events_overview()
-
-    # National activity
-    activity_score = min(100, int((news.get("headline_count", 0) / 20) * 100))
-    if cse.get("gainers_count", 0) + cse.get("losers_count", 0) > 10:
-        activity_score = min(100, activity_score + 10)
+def _cached(name, compute):
+    def timed():
+        with metrics.span(name):
+            return compute()
+    return snapshot_cache.get(f"section:{name}", timed)
 
-    # Market volatility
-    mv = 0
-    try:
-        total_moves = cse["gainers_count"] + cse["losers_count"]
-        if total_moves > 0:
-            mv = (cse["losers_count"] / max(1, total_moves)) * 100
-    except Exception:
-        mv = 0
+def build_ml_input():
+    cse = _cached("cse", get_cse_overview)
+    news = _cached("news", get_news_overview)
+    weather = _cached("weather", get_weather_overview)
 
-    # ML Engine Integration
     ml_input = {
         "news": news.get("raw", []),
         "cse_gainers": cse.get("gainers", []),
+        "cse_losers": cse.get("losers", []),
+        "cse_prices": cse.get("prices", []),
         "weather": []
     }
     
@@ -217,11 +224,33 @@ def build_overall_indicators():
             w_item = data.copy()
             w_item["city"] = city
             ml_input["weather"].append(w_item)
+    return ml_input
 
-    # Run Analysis
-    ml_trends = detect_trends(ml_input)
-    ml_anomalies = detect_anomalies(ml_input)
-    ml_clusters = cluster_events(ml_input)
+def build_scores():
+    cse = _cached("cse", get_cse_overview)
+    market = _cached("market_metrics", get_market_metrics)
+    news = _cached("news", get_news_overview)
+    weather = _cached("weather", get_weather_overview)
+    traffic = _cached("traffic", get_traffic_overview)
+    cbsl = _cached("cbsl", get_cbsl_overview)
+    events = _cached("events", get_events_overview)
+    ml_anomalies = get_section("ml_anomalies")
+
+    # National activity
+    activity_score = min(100, int((news.get("headline_count", 0) / 20) * 100))
+    if cse.get("gainers_count", 0) + cse.get("losers_count", 0) > 10:
+        activity_score = min(100, activity_score + 10)
+
+    # Market volatility: breadth, realized volatility and dispersion over all prices
+    mv = 0
+    breadth = market.get("breadth")
+    if market.get("symbols"):
+        mv = market["stress_percent"]
+    else:
+        # No price table yet: fall back to the top-N gainer/loser lists
+        total_moves = cse.get("gainers_count", 0) + cse.get("losers_count", 0)
+        if total_moves > 0:
+            mv = (cse["losers_count"] / max(1, total_moves)) * 100
 
     # Risk score adjustments based on new ML
     # If we have market anomalies, increase risk
@@ -244,7 +273,10 @@ def build_overall_indicators():
 
     # Opportunity score
     opp_score = 0
-    if cse.get("gainers_count", 0) > cse.get("losers_count", 0):
+    if breadth:
+        if breadth["advancers"] > breadth["decliners"]:
+            opp_score += 30
+    elif cse.get("gainers_count", 0) > cse.get("losers_count", 0):
         opp_score += 30
     if activity_score > 50:
         opp_score += 10
@@ -260,13 +292,52 @@ def build_overall_indicators():
         "market_volatility_percent": mv,
         "risk_score": risk_score,
         "opportunity_score": opp_score,
-        "cse": cse,
-        "news": news,
-        "weather": weather,
-        "traffic": traffic,
-        "cbsl": cbsl,
-        "events": events,
-        "ml_trends": ml_trends,
-        "ml_anomalies": ml_anomalies,
-        "ml_clusters": ml_clusters
     }
+
+SCORE_FIELDS = ["national_activity_score", "market_volatility_percent", "risk_score", "opportunity_score"]
+
+# Each top-level indicator section and how to compute it; computed lazily and
+# cached per data version, so a request only pays for the sections it uses
+SECTION_BUILDERS = {
+    "cse": get_cse_overview,
+    "news": get_news_overview,
+    "weather": get_weather_overview,
+    "traffic": get_traffic_overview,
+    "cbsl": get_cbsl_overview,
+    "events": get_events_overview,
+    "market_metrics": get_market_metrics,
+    "ml_trends": lambda: get_ml_section("ml_trends"),
+    "ml_anomalies": lambda: get_ml_section("ml_anomalies"),
+    "ml_clusters": lambda: get_ml_section("ml_clusters"),
+}
+
+def get_ml_section(name):
+    """Latest completed result of one ML stage; starts a background run of that stage if the data moved on."""
+    start_analysis((name,))
+    return analysis.result(name)
+
+def start_analysis(stages=STAGES):
+    analysis.request(snapshot_cache.data_version(), _cached("ml_input", build_ml_input), stages)
+
+def get_section(name):
+    if name in SCORE_FIELDS:
+        return _cached("scores", build_scores)[name]
+    return _cached(name, SECTION_BUILDERS[name])
+
+def build_overall_indicators(sections=None):
+    """
+    Builds the indicator object. `sections` limits it to the given top-level
+    keys (score fields and/or SECTION_BUILDERS names); everything else is
+    skipped. Each ML section runs only its own stage (see analysis.py), e.g.
+    the scores need "ml_anomalies" but no clustering runs unless
+    "ml_clusters" is asked for.
+    """
+    names = SCORE_FIELDS + list(SECTION_BUILDERS) if sections is None else sections
+    return {name: get_section(name) for name in names if name in SCORE_FIELDS or name in SECTION_BUILDERS}
+
+def get_overall_indicators(sections=None):
+    """Indicators for the current snapshot version; each section is computed once per collector cycle."""
+    return build_overall_indicators(sections)
+
+def get_cse_overview_cached():
+    return get_section("cse")
@@ -0,0 +1,72 @@
+"""
+Field projection and paging helpers for the JSON endpoints.
+
+`fields` is a comma-separated list of dotted paths into the response
+(``fields=risk_score,news.latest,cbsl.raw.rates``); `view` names a preset list
+of paths. Endpoints use the top-level keys of the requested paths to decide
+which sections to compute at all.
+"""
+
+
+def parse_fields(fields=None, view=None, views=None):
+    """Returns the sorted, de-duplicated list of requested paths, or None for everything."""
+    paths = []
+    if view and views and view in views:
+        paths.extend(views[view] or [])
+    if fields:
+        paths.extend(p.strip() for p in fields.split(","))
+    paths = sorted({p for p in paths if p})
+    if not paths:
+        return None
+    # "news" already covers "news.latest"
+    return [p for p in paths if not any(p.startswith(q + ".") for q in paths)]
+
+
+def top_level(paths):
+    return {p.split(".", 1)[0] for p in paths}
+
+
+def project(data, paths):
+    """Copies only the given dotted paths of `data` into a new nested dict."""
+    out = {}
+    for path in paths:
+        keys = path.split(".")
+        src, dst = data, out
+        for i, key in enumerate(keys):
+            if not isinstance(src, dict) or key not in src:
+                break
+            if i == len(keys) - 1:
+                dst[key] = src[key]
+            else:
+                src = src[key]
+                dst = dst.setdefault(key, {})
+    return out
+
+
+def _sort_key(field):
+    def key(row):
+        value = row.get(field) if isinstance(row, dict) else None
+        try:
+            return (0, float(value))
+        except (TypeError, ValueError):
+            return (1, 0.0)  # missing / non-numeric values sort last
+    return key
+
+
+def sort_rows(rows, sort):
+    """`sort` is a field name, prefixed with '-' for descending order."""
+    if not sort:
+        return rows
+    descending = sort.startswith("-")
+    field = sort.lstrip("-+")
+    key = _sort_key(field)
+    if descending:
+        present = [r for r in rows if key(r)[0] == 0]
+        missing = [r for r in rows if key(r)[0] == 1]
+        return sorted(present, key=key, reverse=True) + missing
+    return sorted(rows, key=key)
+
+
+def page(rows, offset=0, limit=None):
+    offset = max(0, offset or 0)
+    return rows[offset:offset + limit] if limit is not None else rows[offset:]
@@ -0,0 +1,86 @@
+"""
+Pre-serialized, conditionally-served JSON responses.
+
+Each endpoint's payload is serialized once per data version (plus gzip, and
+brotli when the `brotli` package is installed) and carries a strong ETag
+derived from the body. A poll that sends a matching If-None-Match gets a
+body-less 304, so between collector cycles a request costs one version check
+and one string comparison.
+"""
+
+import gzip
+import hashlib
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from backend.common import jsonio
+except ImportError:
+    from common import jsonio
+
+MIN_COMPRESS_BYTES = 1024
+JSON_MEDIA_TYPE = "application/json"
+
+
+def to_json_bytes(obj):
+    return jsonio.dumps(obj)
+
+
+class FastJSONResponse(Response):
+    """JSONResponse replacement that renders through common/jsonio (orjson when available)."""
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content):
+        return jsonio.dumps(content)
+
+
+class SerializedPayload:
+    def __init__(self, body):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.encoded = {}  # content-coding -> (body, etag)
+        if len(body) >= MIN_COMPRESS_BYTES:
+            # Encoded variants are different representations, so they get their own strong ETags
+            self.encoded["gzip"] = (gzip.compress(body, compresslevel=6), self.etag[:-1] + '-gz"')
+            if brotli is not None:
+                self.encoded["br"] = (brotli.compress(body), self.etag[:-1] + '-br"')
+
+    @staticmethod
+    def matches(if_none_match, etag):
+        """True if If-None-Match names `etag`, the ETag of the variant about to be served."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # Strong comparison: W/ tags and the other encodings' tags do not match
+        tags = {t.strip() for t in if_none_match.split(",")}
+        return etag in tags
+
+    def pick(self, accept_encoding):
+        """Returns (body, etag, content-coding or None) for the client's Accept-Encoding."""
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+        for coding in ("br", "gzip"):
+            if coding in accepted and coding in self.encoded:
+                body, etag = self.encoded[coding]
+                return body, etag, coding
+        return self.body, self.etag, None
+
+
+def serialize(obj):
+    return SerializedPayload(to_json_bytes(obj))
+
+
+def conditional_response(request: Request, payload: SerializedPayload):
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    body, etag, coding = payload.pick(request.headers.get("accept-encoding"))
+    headers["ETag"] = etag
+    if payload.matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,151 @@
+"""
+In-process collector scheduler.
+
+Imports the ``run()`` function of each module in ``backend/collectors`` once
+and runs them concurrently on a small thread pool, each on its own interval.
+A slow or hanging source only delays itself: every job has a timeout, a random
+jitter so sources don't fire in lock-step, and overlap protection so a run
+that outlived its timeout is never started twice.
+"""
+
+import asyncio
+import importlib
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from backend.common import metrics, retention
+    from backend.common.cse_schedule import policy as cse_policy
+except ImportError:
+    from common import metrics, retention
+    from common.cse_schedule import policy as cse_policy
+
+# "backend" when imported as backend.app.scheduler, "" when run from backend/
+_ROOT_PACKAGE = (__package__ or "").rpartition(".")[0]
+
+def import_collector(module_name):
+    package = f"{_ROOT_PACKAGE}.collectors" if _ROOT_PACKAGE else "collectors"
+    return importlib.import_module(f"{package}.{module_name}")
+
+
+class CollectorJob:
+    """
+    One collector module scheduled on its own cadence.
+
+    `interval` is either a number of seconds or a callable taking the current
+    UTC datetime and returning one, for sources whose cadence depends on time.
+    Housekeeping jobs pass `run_fn` directly instead of a collector module.
+    """
+
+    def __init__(self, name, module, interval, timeout=120, jitter=5, run_fn=None):
+        self.name = name
+        self.module = module
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.run_fn = run_fn
+        self.running = None  # Future of the run currently executing, if any
+        self.last_started = None
+        self.last_duration = None
+        self.last_error = None
+        self.runs = 0
+
+    def next_delay(self):
+        interval = self.interval(datetime.utcnow()) if callable(self.interval) else self.interval
+        return interval + random.uniform(0, self.jitter)
+
+    def load(self):
+        if self.run_fn is None:
+            self.run_fn = import_collector(self.module).run
+        return self.run_fn
+
+    def status(self):
+        return {
+            "running": self.running is not None and not self.running.done(),
+            "runs": self.runs,
+            "last_started": self.last_started,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+        }
+
+
+DEFAULT_JOBS = [
+    CollectorJob("traffic", "traffic_collector", interval=300),
+    CollectorJob("cbsl", "cbsl_collector", interval=1800),
+    CollectorJob("events", "events_collector", interval=86400),
+    # Seconds to minutes while the market is open, hourly when closed, idle on holidays (common/cse_schedule.py)
+    CollectorJob("cse", "cse_collector", interval=cse_policy.next_delay, jitter=2),
+    CollectorJob("news", "news_collector", interval=300),
+    CollectorJob("weather", "weather_collector", interval=600),
+    # Compacts old per-cycle files into daily archives and enforces the disk budget
+    CollectorJob("retention", None, interval=3600, timeout=600, jitter=60, run_fn=retention.run),
+]
+
+
+class CollectorScheduler:
+    def __init__(self, jobs=None):
+        self.jobs = list(jobs or DEFAULT_JOBS)
+        self.on_run = None  # called with the job after every run, e.g. to publish status
+        self._executor = None
+        self._tasks = []
+
+    def start(self):
+        """Schedules every job on the running event loop."""
+        if self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=len(self.jobs), thread_name_prefix="collector")
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._job_loop(job)) for job in self.jobs]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            # Collector threads can't be interrupted; don't wait for them
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def status(self):
+        return {job.name: job.status() for job in self.jobs}
+
+    async def _job_loop(self, job):
+        loop = asyncio.get_running_loop()
+        # Stagger the first round so sources don't all start at the same instant
+        await asyncio.sleep(random.uniform(0, job.jitter))
+        while True:
+            await self._run_once(loop, job)
+            await asyncio.sleep(job.next_delay())
+
+    async def _run_once(self, loop, job):
+        if job.running is not None and not job.running.done():
+            logging.warning("Collector %s still running from a previous cycle; skipping", job.name)
+            return
+        started = time.monotonic()
+        job.last_started = datetime.utcnow().isoformat()
+        outcome = "ok"
+        try:
+            # Importing pulls in pandas/requests; keep that off the event loop too
+            run_fn = await loop.run_in_executor(self._executor, job.load)
+            job.running = loop.run_in_executor(self._executor, run_fn)
+            await asyncio.wait_for(asyncio.shield(job.running), timeout=job.timeout)
+            job.last_error = None
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            job.last_error = f"timed out after {job.timeout}s"
+            logging.warning("Collector %s timed out after %ss", job.name, job.timeout)
+        except Exception as e:
+            outcome = "error"
+            job.last_error = str(e)
+            logging.exception("Collector %s failed: %s", job.name, e)
+        finally:
+            job.runs += 1
+            job.last_duration = round(time.monotonic() - started, 3)
+            metrics.COLLECTOR_SECONDS.observe(time.monotonic() - started, collector=job.name)
+            metrics.COLLECTOR_RUNS.inc(collector=job.name, outcome=outcome)
+            if self.on_run is not None:
+                self.on_run(job)
@@ -0,0 +1,100 @@
+"""
+Server-Sent Events push channel for dashboard updates.
+
+A single watcher task polls the snapshot version (a few stat() calls), and
+when a collector publishes new data it builds the dashboard payload once,
+serializes it once and hands the same string to every connected client. Load
+therefore follows the data change rate, not the number of open screens.
+"""
+
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from backend.common import jsonio
+except ImportError:
+    from common import jsonio
+
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 5000
+
+
+class SnapshotBroadcaster:
+    def __init__(self, version_fn, build_payload, poll_interval=2.0):
+        self.version_fn = version_fn
+        self.build_payload = build_payload
+        self.poll_interval = poll_interval
+        self.latest = None  # (event id, serialized payload)
+        self._version = None
+        self._event_id = 0
+        self._subscribers = set()
+        self._task = None
+
+    @property
+    def client_count(self):
+        return len(self._subscribers)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def subscribe(self):
+        # Only the newest snapshot matters, so a slow client just skips stale ones
+        queue = asyncio.Queue(maxsize=1)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, message):
+        self.latest = message
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def refresh(self):
+        version = await run_in_threadpool(self.version_fn)
+        if version == self._version:
+            return
+        payload = await run_in_threadpool(self.build_payload)
+        self._version = version
+        self._event_id += 1
+        self._publish((self._event_id, jsonio.dumps(payload).decode("utf-8")))
+
+    async def _watch(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Snapshot broadcast failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def events(self, request):
+        """Async generator of SSE frames for one client."""
+        queue = self.subscribe()
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while True:
+                try:
+                    event_id, data = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event_id}\nevent: snapshot\ndata: {data}\n\n"
+        finally:
+            self.unsubscribe(queue)
@@ -0,0 +1,75 @@
+"""
+Parse / serialize timings for the JSON paths: stdlib json (the previous
+behaviour) against common/jsonio (orjson when installed).
+
+Parses every ``*_latest.json`` under backend/data and serializes the full
+/api/signals payload built from them. Run from the repository root:
+
+    python -m backend.benchmarks.json_bench [--repeat 200]
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+
+from backend.common import jsonio
+from backend.common.snapshots import DATA_DIR
+
+
+def _median_us(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, default=str, ensure_ascii=False).encode("utf-8")
+
+
+def run(repeat=200):
+    files = sorted(glob.glob(os.path.join(DATA_DIR, "*", "*_latest.json")))
+    blobs = {}
+    for path in files:
+        with open(path, "rb") as f:
+            blobs[os.path.relpath(path, DATA_DIR)] = f.read()
+
+    from backend.app.main import signals_payload
+    payload = signals_payload()
+    body = jsonio.dumps(payload)
+
+    rows = []
+    parse_std = sum(_median_us(lambda b=b: json.loads(b), repeat) for b in blobs.values())
+    parse_fast = sum(_median_us(lambda b=b: jsonio.loads(b), repeat) for b in blobs.values())
+    rows.append((f"parse {len(blobs)} latest files ({sum(map(len, blobs.values())) // 1024} KiB)", parse_std, parse_fast))
+    rows.append((
+        f"serialize /api/signals ({len(body) // 1024} KiB)",
+        _median_us(lambda: _stdlib_dumps(payload), repeat),
+        _median_us(lambda: jsonio.dumps(payload), repeat),
+    ))
+    rows.append((
+        "parse /api/signals body",
+        _median_us(lambda: json.loads(body), repeat),
+        _median_us(lambda: jsonio.loads(body), repeat),
+    ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"jsonio backend: {jsonio.BACKEND}   (median of {args.repeat} runs, microseconds)")
+    print(f"{'operation':<45} {'stdlib':>10} {jsonio.BACKEND:>10} {'speedup':>8}")
+    for name, before, after in run(args.repeat):
+        print(f"{name:<45} {before:>10.1f} {after:>10.1f} {before / max(after, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark suite for the indicator pipeline and the API endpoints.
+
+Replays the recorded fixtures in backend/data (nothing is fetched; the
+collector scheduler is not started) and reports p50/p95/p99 latency and
+allocation peaks for:
+
+- every processor section, parsed cold from disk each run
+- the ML stages (detect_trends, detect_anomalies, cluster_events) in steady
+  state, called in-process, with the first (cold) call reported separately
+- build_overall_indicators() with an empty snapshot cache
+- the HTTP endpoints under concurrent clients, against a local uvicorn server
+
+Reports are JSON, so two commits can be compared:
+
+    python -m backend.benchmarks.run --out before.json
+    python -m backend.benchmarks.run --out after.json
+    python -m backend.benchmarks.run --compare before.json after.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import socket
+import subprocess
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENDPOINTS = [
+    "/api/signals",
+    "/api/signals?view=slim",
+    "/api/risk",
+    "/api/opportunities",
+    "/api/market",
+    "/api/market?sort=-changePercentage&limit=10",
+]
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+def measure(fn, runs, setup=None):
+    """Times `fn` `runs` times (after `setup()` each time) and records its allocation peak."""
+    samples = []
+    first_ms = None
+    for i in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i == 0:
+            first_ms = elapsed
+        samples.append(elapsed)
+
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = percentiles(samples)
+    stats["first_ms"] = first_ms
+    stats["peak_alloc_kib"] = peak / 1024
+    return stats
+
+
+def bench_pipeline(runs):
+    from backend.app import processors
+
+    def cold_reads():
+        # A fresh reader parses every fixture again, as after a collector cycle
+        processors.snapshot_reader = processors.SnapshotReader(processors.BASE)
+        processors.snapshot_cache.clear()
+
+    results = {}
+    for name in ("cse", "news", "weather", "traffic", "cbsl", "events"):
+        results[f"section.{name}"] = measure(processors.SECTION_BUILDERS[name], runs, setup=cold_reads)
+
+    from backend.ml_engine import analyzer
+
+    ml_input = processors.build_ml_input()
+    for stage in (analyzer.detect_trends, analyzer.detect_anomalies, analyzer.cluster_events):
+        results[f"ml.{stage.__name__}"] = measure(lambda stage=stage: stage(ml_input), runs)
+
+    # ML sections come from the analysis worker's latest results here
+    results["build_overall_indicators"] = measure(
+        processors.build_overall_indicators, runs, setup=processors.snapshot_cache.clear
+    )
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server():
+    import uvicorn
+    from backend.app.main import app
+
+    port = _free_port()
+    # lifespan off: no collector scheduler, SSE watcher or model warm-up
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("benchmark server did not start")
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def bench_endpoints(clients, requests_per_client):
+    import requests
+
+    server, thread, base = _start_server()
+    results = {}
+    try:
+        for path in ENDPOINTS:
+            for conditional in (False, True):
+                url = base + path
+                etag = requests.get(url).headers.get("etag")  # also warms the cache
+                headers = {"If-None-Match": etag} if conditional and etag else {}
+
+                def client(_):
+                    session = requests.Session()
+                    samples = []
+                    for _ in range(requests_per_client):
+                        start = time.perf_counter()
+                        r = session.get(url, headers=headers)
+                        r.content
+                        samples.append((time.perf_counter() - start) * 1000)
+                    return samples
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    samples = [s for chunk in pool.map(client, range(clients)) for s in chunk]
+                wall = time.perf_counter() - start
+
+                stats = percentiles(samples)
+                stats["throughput_rps"] = len(samples) / wall
+                results[f"http GET {path}{' (304)' if conditional else ''}"] = stats
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def _max_rss_mib():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if platform.system() == "Darwin" else rss / 1024
+
+
+def run(runs=50, clients=50, requests_per_client=20, http=True):
+    from backend.common import jsonio
+
+    report = {
+        "commit": _git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "json_backend": jsonio.BACKEND,
+        "config": {"runs": runs, "clients": clients, "requests_per_client": requests_per_client},
+        "results": bench_pipeline(runs),
+    }
+    if http:
+        report["results"].update(bench_endpoints(clients, requests_per_client))
+    report["max_rss_mib"] = _max_rss_mib()
+    return report
+
+
+def print_report(report):
+    print(f"commit {report.get('commit')}  python {report.get('python')}  json {report.get('json_backend')}  "
+          f"max RSS {report.get('max_rss_mib') or 0:.0f} MiB")
+    print(f"{'benchmark':<60} {'p50':>8} {'p95':>8} {'p99':>8} {'first':>8} {'peak KiB':>9} {'req/s':>8}")
+    for name, s in report["results"].items():
+        first = f"{s['first_ms']:.2f}" if s.get("first_ms") is not None else "-"
+        peak = f"{s['peak_alloc_kib']:.0f}" if "peak_alloc_kib" in s else "-"
+        rps = f"{s['throughput_rps']:.0f}" if "throughput_rps" in s else "-"
+        print(f"{name:<60} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {first:>8} {peak:>9} {rps:>8}")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before.get('commit')} -> {after.get('commit')}  (ms; negative change = faster)")
+    print(f"{'benchmark':<60} {'p50':>16} {'p95':>16} {'p99':>16}")
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            print(f"{name:<60} {'(new)':>16}")
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{new[key]:.2f} ({change:+.0f}%)")
+        print(f"{name:<60} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indicator pipeline and API endpoints.")
+    parser.add_argument("--runs", type=int, default=50, help="iterations per pipeline stage")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent HTTP clients")
+    parser.add_argument("--requests", type=int, default=20, help="requests per HTTP client per endpoint")
+    parser.add_argument("--no-http", action="store_true", help="skip the endpoint load test")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args.runs, args.clients, args.requests, http=not args.no_http)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Runs the collectors as their own service, separate from the API workers:
+
+    python -m backend.collectors
+
+Start the API with COLLECTOR_MODE=off so its workers stay read-only. If
+another process already holds the leader lock this one waits and takes over
+when it goes away.
+"""
+
+import asyncio
+
+from backend.app.leader import run_standalone
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone())
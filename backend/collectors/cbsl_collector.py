@@ -8,21 +8,22 @@ Behavior:
 """
 
 import os
-import json
+import sys
 import datetime
 import logging
-import requests
-import pandas as pd
-from pathlib import Path
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+try:
+    from backend.common import jsonio, logs, series, snapshots, tsdb
+    from backend.common.http_client import client as http
+except ImportError:
+    from common import jsonio, logs, series, snapshots, tsdb
+    from common.http_client import client as http
 
 OUTPUT_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data", "cbsl")
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-logging.basicConfig(
-    filename=os.path.join(OUTPUT_FOLDER, "cbsl_collector.log"),
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-)
+log = logs.collector_logger("cbsl_collector", OUTPUT_FOLDER)
 
 # We'll use exchangerate.host free API (no key)
 EXRATE_BASE = "https://api.exchangerate.host/latest"
@@ -40,8 +41,7 @@ def fetch_exchange_rates():
     url = "https://open.er-api.com/v6/latest/USD"
     
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
+        r = http.get(url, timeout=10)
         data = r.json()
         rates = data.get("rates", {})
         
@@ -62,7 +62,7 @@ def fetch_exchange_rates():
                     results[cur] = {"lkr_per_unit": float(lkr_per_unit), "timestamp": data.get("time_last_update_utc")}
                     
     except Exception as e:
-        logging.warning("Failed to fetch rates from API: %s. Using mock data.", e)
+        log.warning("Failed to fetch rates from API: %s. Using mock data.", e)
         # Mock fallback
         results = {
             "USD": {"lkr_per_unit": 295.50, "timestamp": datetime.datetime.utcnow().isoformat()},
@@ -79,8 +79,7 @@ def read_previous_rates():
     latest_path = os.path.join(OUTPUT_FOLDER, "rates_latest.json")
     if os.path.exists(latest_path):
         try:
-            with open(latest_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return jsonio.load_file(latest_path)
         except Exception:
             return {}
     return {}
@@ -98,7 +97,7 @@ def compute_changes(prev, current):
     return out
 
 def run():
-    logging.info("CBSL collector started")
+    log.info("CBSL collector started")
     rates = fetch_exchange_rates()
     prev = read_previous_rates()
     changes = compute_changes(prev, rates)
@@ -110,12 +109,13 @@ def run():
     ts = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     json_path = os.path.join(OUTPUT_FOLDER, f"rates_{ts}.json")
     latest = os.path.join(OUTPUT_FOLDER, "rates_latest.json")
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, ensure_ascii=False, indent=2)
-    with open(latest, "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, ensure_ascii=False, indent=2)
-    logging.info("Saved CBSL snapshot to %s", json_path)
+    jsonio.dump_file(json_path, snapshot)
+    snapshots.record_snapshot(json_path)
+    tsdb.record(series.cbsl_points(snapshot))
+    snapshots.publish_json(latest, snapshot)
+    log.info("Saved CBSL snapshot to %s", json_path)
     return {"json": json_path, "latest": latest}
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=logs.FORMAT)
     run()
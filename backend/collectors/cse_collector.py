@@ -1,12 +1,18 @@
-import requests
 import pandas as pd
 import os
+import sys
 import datetime
-import time
 import logging
-import json
 
-import glob
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+try:
+    from backend.common import deltas, jsonio, logs, series, snapshots, tsdb
+    from backend.common.cse_schedule import policy
+    from backend.common.http_client import client as http
+except ImportError:
+    from common import deltas, jsonio, logs, series, snapshots, tsdb
+    from common.cse_schedule import policy
+    from common.http_client import client as http
 
 OUTPUT_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data", "cse")
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
@@ -20,51 +26,45 @@ endpoints = {
     "indices": "https://www.cse.lk/api/marketIndices"
 }
 
+# Row identity per endpoint for delta encoding; the others are small and saved whole when they change
+ROW_KEYS = {"prices": "symbol", "gainers": "symbol", "losers": "symbol"}
+snapshot_logs = {name: deltas.SnapshotLog(OUTPUT_FOLDER, name, key=ROW_KEYS.get(name)) for name in endpoints}
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; situational-awareness-bot/1.0)",
     "Referer": "https://www.cse.lk/",
     "Origin": "https://www.cse.lk"
 }
 
-logging.basicConfig(
-    filename=os.path.join(OUTPUT_FOLDER, "cse_collector.log"),
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-)
+log = logs.collector_logger("cse_collector", OUTPUT_FOLDER)
 
 def get_latest_saved_data(name):
     """Retrieves the latest saved CSV for a given endpoint name."""
-    pattern = os.path.join(OUTPUT_FOLDER, f"{name}_*.csv")
-    files = glob.glob(pattern)
-    if not files:
+    # One index lookup; old files may already be compacted into archives (common/retention.py)
+    snapshot_log = snapshot_logs[name]
+    latest_file = snapshot_log.latest_path()
+    if latest_file is None:
         return None
-    
-    # Sort by modification time, newest first
-    files.sort(key=os.path.getmtime, reverse=True)
-    latest_file = files[0]
-    
+
     try:
-        logging.info("Loading fallback data from %s", latest_file)
-        df = pd.read_csv(latest_file)
-        return df
+        log.info("Loading fallback data from %s", latest_file)
+        if latest_file.endswith(".csv"):
+            # saved before delta encoding
+            return pd.read_csv(latest_file)
+        return pd.DataFrame(snapshot_log.latest())
     except Exception as e:
-        logging.error("Failed to load fallback data from %s: %s", latest_file, e)
+        log.error("Failed to load fallback data from %s: %s", latest_file, e)
         return None
 
 def safe_post(url, headers=HEADERS, retries=3, timeout=10):
-    for attempt in range(1, retries + 1):
-        try:
-            res = requests.post(url, headers=headers, timeout=timeout)
-            res.raise_for_status()
-            return res
-        except Exception as e:
-            logging.warning("Attempt %d failed for %s: %s", attempt, url, e)
-            if attempt < retries:
-                time.sleep(2 ** attempt)
-    raise RuntimeError(f"All {retries} attempts failed for {url}")
+    # Pooled per-host session; retries back off in this thread only
+    try:
+        return http.post(url, headers=headers, retries=retries, timeout=timeout)
+    except Exception as e:
+        raise RuntimeError(f"All {retries} attempts failed for {url}: {e}") from e
 
 def fetch_and_save(name, url):
-    logging.info("Fetching %s from %s", name, url)
+    log.info("Fetching %s from %s", name, url)
     try:
         res = safe_post(url)
         data = res.json()
@@ -73,55 +73,82 @@ def fetch_and_save(name, url):
         df = None
         if isinstance(data, list):
             df = pd.DataFrame(data)
-            logging.info("Fetched list with %d rows", len(df))
+            log.info("Fetched list with %d rows", len(df))
         elif isinstance(data, dict):
             # attempt to extract inner list
             found_list = False
             for k, v in data.items():
                 if isinstance(v, list) and len(v) >= 1:
                     df = pd.DataFrame(v)
-                    logging.info("Extracted list from key %s with %d rows", k, len(df))
+                    log.info("Extracted list from key %s with %d rows", k, len(df))
                     found_list = True
                     break
             if not found_list:
                 df = pd.DataFrame([data])
-                logging.info("Saved dict as single-row DataFrame")
+                log.info("Saved dict as single-row DataFrame")
 
         if df is not None and not df.empty:
-            ts = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            df["fetched_at_utc"] = datetime.datetime.utcnow().isoformat()
-            csv_path = os.path.join(OUTPUT_FOLDER, f"{name}_{ts}.csv")
-            df.to_csv(csv_path, index=False)
-            # also save latest JSON shard for quick API access
+            now = datetime.datetime.utcnow()
             latest_json_path = os.path.join(OUTPUT_FOLDER, f"{name}_latest.json")
-            df.to_json(latest_json_path, orient="records", date_format="iso")
-            logging.info("Saved to %s and %s", csv_path, latest_json_path)
-            return {"csv": csv_path, "json": latest_json_path}
+            # JSON round trip: NaN becomes null, as in the served file
+            rows = jsonio.loads(df.to_json(orient="records", date_format="iso"))
+            outcome, path = snapshot_logs[name].save(rows, now)
+            if outcome == "unchanged":
+                # Nothing to write; the latest file and the history already hold this data
+                log.info("%s unchanged since %s; skipped writing", name, os.path.basename(path))
+                return {"unchanged": path, "json": latest_json_path}
+            fetched_at = now.isoformat()
+            rows = [dict(row, fetched_at_utc=fetched_at) for row in rows]
+            tsdb.record(series.cse_points(name, rows))
+            # also save latest JSON shard for quick API access
+            snapshots.publish_json(latest_json_path, rows)
+            log.info("Saved %s to %s and %s", outcome, path, latest_json_path)
+            return {outcome: path, "json": latest_json_path}
         else:
-            logging.warning("No usable data found for %s (df empty)", name)
+            log.warning("No usable data found for %s (df empty)", name)
+            latest_json_path = os.path.join(OUTPUT_FOLDER, f"{name}_latest.json")
+            if os.path.exists(latest_json_path):
+                # The API still serves the last good data; rewriting it would only bump its version
+                log.info("Keeping %s", latest_json_path)
+                return {"kept": latest_json_path, "json": latest_json_path}
             # Fallback to Saved Data if API returns empty
-            logging.info("Attempting to load saved data for %s", name)
+            log.info("Attempting to load saved data for %s", name)
             df = get_latest_saved_data(name)
             
             if df is not None and not df.empty:
-                # We don't save a new CSV, but we do update the 'latest.json' so the API serves this old data
-                latest_json_path = os.path.join(OUTPUT_FOLDER, f"{name}_latest.json")
-                df.to_json(latest_json_path, orient="records", date_format="iso")
-                logging.info("Restored saved data to %s", latest_json_path)
+                # We don't save a new snapshot, but we do restore 'latest.json' so the API serves this old data
+                snapshots.publish_bytes(latest_json_path, df.to_json(orient="records", date_format="iso").encode("utf-8"))
+                log.info("Restored saved data to %s", latest_json_path)
                 return {"csv": "restored_from_cache", "json": latest_json_path}
             return None
     except Exception as ex:
-        logging.exception("Failed fetching %s: %s", name, ex)
+        log.exception("Failed fetching %s: %s", name, ex)
+        return None
+
+def read_market_status():
+    try:
+        rows = jsonio.load_file(os.path.join(OUTPUT_FOLDER, "status_latest.json"))
+        return rows[0].get("status") if isinstance(rows, list) and rows else None
+    except (OSError, ValueError):
         return None
 
 def run():
-    logging.info("CSE collector started")
-    results = {}
-    for name, url in endpoints.items():
-        out = fetch_and_save(name, url)
-        results[name] = out
-    logging.info("CSE collector finished")
+    if not policy.trading_day():
+        log.info("CSE closed today (weekend or holiday); skipping")
+        return {}
+    log.info("CSE collector started")
+    # The market status decides what else is worth fetching this cycle (common/cse_schedule.py)
+    results = {"status": fetch_and_save("status", endpoints["status"])}
+    policy.observe(read_market_status() if results["status"] else None)
+    due = policy.due([name for name in endpoints if name != "status"])
+    # Due endpoints are fetched concurrently; a slow one no longer holds up the rest
+    outputs = [output for output, _ in http.fan_out(lambda name: fetch_and_save(name, endpoints[name]), due)]
+    results.update(zip(due, outputs))
+    policy.fetched([name for name, output in zip(due, outputs) if output])
+    log.info("CSE collector finished (market %s; fetched %s)",
+                 "open" if policy.market_open else "closed", ", ".join(due) or "status only")
     return results
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=logs.FORMAT)
     run()
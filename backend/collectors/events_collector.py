@@ -9,19 +9,22 @@ Behavior:
 """
 
 import os
-import requests
-import json
+import sys
 import datetime
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+try:
+    from backend.common import jsonio, logs, snapshots
+    from backend.common.http_client import client as http
+except ImportError:
+    from common import jsonio, logs, snapshots
+    from common.http_client import client as http
+
 OUTPUT_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data", "events")
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-logging.basicConfig(
-    filename=os.path.join(OUTPUT_FOLDER, "events_collector.log"),
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-)
+log = logs.collector_logger("events_collector", OUTPUT_FOLDER)
 
 NAGER_API = "https://date.nager.at/api/v3/PublicHolidays"
 COUNTRY_CODE = "LK"  # Sri Lanka
@@ -32,19 +35,17 @@ def fetch_public_holidays(year=None):
     year = year or datetime.datetime.utcnow().year
     try:
         url = f"{NAGER_API}/{year}/{COUNTRY_CODE}"
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
+        r = http.get(url, timeout=10)
         data = r.json()
         # Data is list of objects: date, localName, name, countryCode, fixed, global...
         return data
     except Exception as e:
-        logging.warning("Failed to fetch Nager.Date holidays: %s", e)
+        log.warning("Failed to fetch Nager.Date holidays: %s", e)
         return []
 
 def fetch_google_calendar(url):
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
+        r = http.get(url, timeout=10)
         # try JSON first
         try:
             return r.json()
@@ -52,7 +53,7 @@ def fetch_google_calendar(url):
             # if ICS returned, save raw and return as text entry
             return {"raw": r.text}
     except Exception as e:
-        logging.warning("Failed to fetch Google Calendar feed: %s", e)
+        log.warning("Failed to fetch Google Calendar feed: %s", e)
         return None
 
 FALLBACK_EVENTS = [
@@ -63,7 +64,7 @@ FALLBACK_EVENTS = [
 ]
 
 def run():
-    logging.info("Events collector started")
+    log.info("Events collector started")
     year = datetime.datetime.utcnow().year
     holidays = fetch_public_holidays(year)
     calendar = None
@@ -79,19 +80,19 @@ def run():
 
     # if no holidays found, use fallback small list
     if not holidays:
-        logging.info("No holidays fetched from Nager.Date; using fallback events")
+        log.info("No holidays fetched from Nager.Date; using fallback events")
         result["fallback"] = FALLBACK_EVENTS
 
     ts = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     json_path = os.path.join(OUTPUT_FOLDER, f"events_{ts}.json")
     latest = os.path.join(OUTPUT_FOLDER, "events_latest.json")
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-    with open(latest, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-    logging.info("Saved events snapshot to %s", json_path)
-    logging.info("Events collector finished")
+    jsonio.dump_file(json_path, result)
+    snapshots.record_snapshot(json_path)
+    snapshots.publish_json(latest, result)
+    log.info("Saved events snapshot to %s", json_path)
+    log.info("Events collector finished")
     return {"json": json_path, "latest": latest}
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=logs.FORMAT)
     run()
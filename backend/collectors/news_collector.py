@@ -1,17 +1,21 @@
 import feedparser
 import os
+import sys
 import datetime
-import json
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+try:
+    from backend.common import articles, jsonio, logs, metrics, retention, series, snapshots, tsdb
+    from backend.common.http_client import client as http
+except ImportError:
+    from common import articles, jsonio, logs, metrics, retention, series, snapshots, tsdb
+    from common.http_client import client as http
+
 OUTPUT_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data", "news")
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-logging.basicConfig(
-    filename=os.path.join(OUTPUT_FOLDER, "news_collector.log"),
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-)
+log = logs.collector_logger("news_collector", OUTPUT_FOLDER)
 
 # Add Sri Lankan news RSS feeds here
 RSS_FEEDS = {
@@ -20,47 +24,120 @@ RSS_FEEDS = {
     # add more feeds if needed
 }
 
-def fetch_feed(name, url):
-    logging.info(f"Fetching {name} from {url}")
-    d = feedparser.parse(url)
-    items = []
-    for e in d.entries[:20]: # Limit to 20 for now
-        items.append({
-            "source": name, # Added source field for easier processing
-            "title": e.get("title"),
-            "link": e.get("link"),
-            "published": e.get("published"),
-            "summary": e.get("summary", ""),
-            "sentiment_score": 0.0 # Placeholder for now, could use NLTK/TextBlob later
-        })
-    return items
+HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; situational-awareness-bot/1.0)"}
+# Newest articles per feed kept in news_latest.json for the dashboard and the NLP stages
+LATEST_PER_FEED = 20
+
+store = articles.ArticleStore(OUTPUT_FOLDER)
+
+
+def fetch_feed(name, url, validators):
+    """
+    Conditional GET of one feed. Returns (entries, validators); entries is None
+    when the feed answered 304 Not Modified.
+    """
+    log.info(f"Fetching {name} from {url}")
+    headers = dict(HEADERS)
+    if validators.get("url") == url:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("modified"):
+            headers["If-Modified-Since"] = validators["modified"]
+    res = http.get(url, headers=headers, timeout=15)
+    if res.status_code == 304:
+        return None, validators
+    d = feedparser.parse(res.content, response_headers={k.lower(): v for k, v in res.headers.items()})
+    if d.bozo and not d.entries:
+        raise ValueError(f"unparseable feed: {d.get('bozo_exception')}")
+    validators = {
+        "url": url,
+        "etag": res.headers.get("ETag"),
+        "modified": res.headers.get("Last-Modified"),
+        "entries": len(d.entries),
+    }
+    return d.entries, validators
+
+
+def to_article(name, entry, fetched_at):
+    return {
+        "source": name, # Added source field for easier processing
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "published": entry.get("published"),
+        "summary": entry.get("summary", ""),
+        "sentiment_score": 0.0, # Placeholder for now, could use NLTK/TextBlob later
+        "guid": entry.get("id"),
+        "fetched_at_utc": fetched_at,
+        "keys": articles.article_keys(entry),
+    }
+
+
+def merge_latest(previous, new):
+    """New articles first, then the previous window, keeping the newest LATEST_PER_FEED per source."""
+    kept = []
+    per_feed = {}
+    new = [{k: v for k, v in item.items() if k != "keys"} for item in new]
+    for item in new + (previous if isinstance(previous, list) else []):
+        source = item.get("source")
+        if per_feed.get(source, 0) < LATEST_PER_FEED:
+            per_feed[source] = per_feed.get(source, 0) + 1
+            kept.append(item)
+    return kept
+
 
 def run():
-    logging.info("News collector started")
-    now = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    all_items = [] # Changed to list for easier consumption by processor
-    
-    for name, url in RSS_FEEDS.items():
-        try:
-            items = fetch_feed(name, url)
-            all_items.extend(items)
-            
-            # Save individual feed
-            path = os.path.join(OUTPUT_FOLDER, f"{name}_{now}.json")
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(items, f, ensure_ascii=False, indent=2)
-                
-        except Exception as e:
-            logging.error(f"Failed fetching {name}: {e}")
-            print("Failed", name, e)
-            
-    # also write latest combined file
+    log.info("News collector started")
+    now = datetime.datetime.utcnow()
+    known = store.validators()
+
+    def fetch(item):
+        name, url = item
+        return fetch_feed(name, url, known.get(name) or {})
+
+    results = http.fan_out(fetch, RSS_FEEDS.items())
+
+    new_items = []
+    validators = {}
+    points = []
+    for name, (result, error) in zip(RSS_FEEDS, results):
+        if error is not None:
+            log.error(f"Failed fetching {name}: {error}")
+            continue
+        entries, validators[name] = result
+        if entries is None:
+            log.info(f"{name} not modified")
+            fresh = []
+        else:
+            candidates = [to_article(name, e, now.isoformat()) for e in entries]
+            # One append per feed, so a story two feeds carry is kept under the first
+            fresh = store.add(candidates, now)
+            metrics.NEWS_ENTRIES.inc(len(fresh), feed=name, outcome="new")
+            metrics.NEWS_ENTRIES.inc(len(candidates) - len(fresh), feed=name, outcome="seen")
+        new_items.extend(fresh)
+        listed = validators[name].get("entries", 0)
+        # headline_count keeps its meaning from the per-cycle files: the feed's items, capped at the window
+        points.extend(series.news_points(name, min(listed, LATEST_PER_FEED), now, entries=listed, new=len(fresh)))
+    if validators:
+        store.save_validators(validators)
+    tsdb.record(points)
+
     latest_path = os.path.join(OUTPUT_FOLDER, "news_latest.json") # Renamed to match convention
-    with open(latest_path, "w", encoding="utf-8") as f:
-        json.dump(all_items, f, ensure_ascii=False, indent=2)
-        
-    logging.info(f"Saved {len(all_items)} news items to {latest_path}")
-    return all_items
+    previous = None
+    if os.path.exists(latest_path):
+        try:
+            previous = jsonio.load_file(latest_path)
+        except ValueError:
+            pass
+    if new_items or previous is None:
+        # Downstream readers only see a new generation when there is something new
+        snapshots.publish_json(latest_path, merge_latest(previous, new_items))
+    log.info(f"Stored {len(new_items)} new news items")
+
+    # Stale seen keys, and article files past the news retention policy (see retention.py)
+    store.compact(now, archive_days=retention.load_policies()["news"].archive_days)
+    return new_items
+
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=logs.FORMAT)
     run()
@@ -8,22 +8,24 @@ Behavior:
 """
 
 import os
-import time
-import json
+import sys
 import logging
 import datetime
 import random
-import requests
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+try:
+    from backend.common import logs, series, snapshots, tsdb
+    from backend.common.http_client import client as http
+except ImportError:
+    from common import logs, series, snapshots, tsdb
+    from common.http_client import client as http
+
 OUTPUT_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data", "traffic")
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-logging.basicConfig(
-    filename=os.path.join(OUTPUT_FOLDER, "traffic_collector.log"),
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-)
+log = logs.collector_logger("traffic_collector", OUTPUT_FOLDER)
 
 # Basic set of Sri Lankan cities with rough centroids (lat/lon)
 CITIES = {
@@ -70,10 +72,11 @@ def fetch_tomtom_incidents():
     Query TomTom Traffic Incidents API (requires TOMTOM_KEY).
     We will query a bounding box per city (small box).
     """
-    results = []
     if not TOMTOM_KEY:
-        return results
-    for city, coords in CITIES.items():
+        return []
+
+    def fetch_city(item):
+        city, coords = item
         lat = coords["lat"]
         lon = coords["lon"]
         # small box ~ +-0.05 degrees
@@ -84,14 +87,13 @@ def fetch_tomtom_incidents():
         bbox = f"{min_lat},{min_lon},{max_lat},{max_lon}"
         url = f"https://api.tomtom.com/traffic/services/4/incidentDetails?key={TOMTOM_KEY}&bbox={bbox}"
         try:
-            r = requests.get(url, timeout=10)
-            r.raise_for_status()
+            r = http.get(url, timeout=10)
             data = r.json()
             incidents = data.get("incidents", []) if isinstance(data, dict) else []
             # derive a congestion-like score from incident count
             incident_count = len(incidents)
             congestion = min(100, 10 + incident_count * 15)
-            results.append({
+            return {
                 "city": city,
                 "lat": lat,
                 "lon": lon,
@@ -100,39 +102,45 @@ def fetch_tomtom_incidents():
                 "source": "tomtom",
                 "raw_incidents_count": incident_count,
                 "fetched_at_utc": datetime.datetime.utcnow().isoformat()
-            })
+            }
         except Exception as e:
-            logging.warning("TomTom fetch failed for %s: %s", city, e)
-    return results
+            log.warning("TomTom fetch failed for %s: %s", city, e)
+            return None
+
+    # One request per city, all in flight at once
+    return [r for r, _ in http.fan_out(fetch_city, CITIES.items()) if r]
 
 def save_records(records, name="traffic"):
     if not records:
-        logging.info("No traffic records to save")
+        log.info("No traffic records to save")
         return None
     df = pd.DataFrame(records)
     ts = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     csv_path = os.path.join(OUTPUT_FOLDER, f"{name}_{ts}.csv")
     json_latest = os.path.join(OUTPUT_FOLDER, f"{name}_latest.json")
     df.to_csv(csv_path, index=False)
-    df.to_json(json_latest, orient="records", date_format="iso")
-    logging.info("Saved traffic data to %s and %s", csv_path, json_latest)
+    snapshots.record_snapshot(csv_path)
+    tsdb.record(series.traffic_points(records))
+    snapshots.publish_bytes(json_latest, df.to_json(orient="records", date_format="iso").encode("utf-8"))
+    log.info("Saved traffic data to %s and %s", csv_path, json_latest)
     return {"csv": csv_path, "json": json_latest}
 
 def run():
-    logging.info("Traffic collector started")
+    log.info("Traffic collector started")
     records = []
     if TOMTOM_KEY:
         records = fetch_tomtom_incidents()
         # if TomTom returned nothing, fall back to simulation to ensure something exists
         if not records:
-            logging.info("TomTom returned no incidents; falling back to simulated traffic")
+            log.info("TomTom returned no incidents; falling back to simulated traffic")
             records = simulate_traffic()
     else:
-        logging.info("TOMTOM_KEY not configured — using simulated traffic")
+        log.info("TOMTOM_KEY not configured — using simulated traffic")
         records = simulate_traffic()
     out = save_records(records)
-    logging.info("Traffic collector finished")
+    log.info("Traffic collector finished")
     return out
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=logs.FORMAT)
     run()
@@ -1,18 +1,21 @@
 import os
-import requests
+import sys
 import datetime
-import json
 import logging
 import random
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+try:
+    from backend.common import logs, series, snapshots, tsdb
+    from backend.common.http_client import client as http
+except ImportError:
+    from common import logs, series, snapshots, tsdb
+    from common.http_client import client as http
+
 OUTPUT_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data", "weather")
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-logging.basicConfig(
-    filename=os.path.join(OUTPUT_FOLDER, "weather_collector.log"),
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-)
+log = logs.collector_logger("weather_collector", OUTPUT_FOLDER)
 
 # configure cities or coordinates for Sri Lanka
 LOCATIONS = {
@@ -30,15 +33,14 @@ def fetch_weather_for(lat, lon):
         return None
     url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={OPENWEATHER_KEY}&units=metric"
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
+        r = http.get(url, timeout=10)
         return r.json()
     except Exception as e:
-        logging.error(f"Error fetching weather: {e}")
+        log.error(f"Error fetching weather: {e}")
         return None
 
 def generate_mock_weather():
-    logging.info("Generating mock weather data (No API Key found)")
+    log.info("Generating mock weather data (No API Key found)")
     weather_data = {}
     conditions = ["Sunny", "Rainy", "Cloudy", "Stormy", "Windy"]
     for city in LOCATIONS.keys():
@@ -62,8 +64,8 @@ def run():
     result = {"fetched_at": now, "locations": {}}
     
     if OPENWEATHER_KEY:
-        for name, coords in LOCATIONS.items():
-            data = fetch_weather_for(coords["lat"], coords["lon"])
+        fetched = http.fan_out(lambda coords: fetch_weather_for(coords["lat"], coords["lon"]), LOCATIONS.values())
+        for name, (data, _) in zip(LOCATIONS, fetched):
             if data:
                 result["locations"][name] = data
             else:
@@ -73,11 +75,12 @@ def run():
 
     # Save as weather_latest.json to match other collectors
     latest_path = os.path.join(OUTPUT_FOLDER, "weather_latest.json")
-    with open(latest_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-        
-    logging.info(f"Saved weather data to {latest_path}")
+    tsdb.record(series.weather_points(result))
+    snapshots.publish_json(latest_path, result)
+
+    log.info(f"Saved weather data to {latest_path}")
     return result
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=logs.FORMAT)
     run()
@@ -0,0 +1,228 @@
+"""
+Append-only article store and seen index for the news collector.
+
+Every cycle the collector asks each feed for changes only, and stores each
+article exactly once:
+
+- feed validators. The ETag and Last-Modified of each feed's last response
+  are kept in ``news/feeds.json`` and sent back as If-None-Match /
+  If-Modified-Since, so an unchanged feed answers 304 with no body to
+  download or parse.
+- seen index. ``news/seen.idx`` has one ``<YYYYmmdd>\\t<key>`` line per key
+  ever stored. The keys are a hash of the entry's guid and a hash of its
+  normalized link. An entry is new only if none of its keys is known, so a
+  story carried by two feeds, or re-issued under a new guid, is stored once.
+  Each process reads only the lines appended since its last look.
+- articles. New articles are appended to
+  ``news/articles/articles_YYYYmmdd.jsonl``, one JSON object per line, and
+  never rewritten.
+
+Appends from collectors running as separate processes are serialized with the
+same file lock as the manifest (see snapshots.py). If a cycle dies between the
+two appends, the day's article file is rescanned on the next load, so those
+articles aren't stored twice.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from . import jsonio, metrics
+from .snapshots import DATA_DIR, _exclusive, atomic_write
+
+FEEDS_NAME = "feeds.json"
+SEEN_NAME = "seen.idx"
+ARTICLES_DIR = "articles"
+# Keys older than this are dropped when the index is compacted; feeds only list recent items
+SEEN_DAYS = 60
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+
+def normalize_link(link):
+    """Canonical form of an article URL: lower-case host, no fragment, tracking parameters or trailing slash."""
+    parts = urlsplit(str(link).strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "http", parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def _hash(kind, value):
+    return hashlib.sha1(f"{kind}:{value}".encode("utf-8")).hexdigest()[:20]
+
+
+def article_keys(entry):
+    """Seen-index keys of a feed entry: its guid and its normalized link (or, failing both, title + date)."""
+    keys = []
+    if entry.get("id"):
+        keys.append(_hash("guid", entry["id"]))
+    if entry.get("link"):
+        keys.append(_hash("link", normalize_link(entry["link"])))
+    if not keys:
+        keys.append(_hash("title", f"{entry.get('title')}|{entry.get('published')}"))
+    return keys
+
+
+class ArticleStore:
+    def __init__(self, directory, data_dir=DATA_DIR, seen_days=SEEN_DAYS):
+        self.directory = directory
+        self.data_dir = data_dir
+        self.seen_days = seen_days
+        self.seen_path = os.path.join(directory, SEEN_NAME)
+        self.feeds_path = os.path.join(directory, FEEDS_NAME)
+        self.articles_dir = os.path.join(directory, ARTICLES_DIR)
+        self._seen = {}  # key -> day first stored
+        self._offset = 0  # bytes of seen.idx already read
+        self._inode = None
+        self._recovered = None  # day whose article file was rescanned
+        self._lock = threading.Lock()
+
+    def articles_path(self, day):
+        return os.path.join(self.articles_dir, f"articles_{day}.jsonl")
+
+    # Feed validators
+
+    def validators(self):
+        """{feed: {"url", "etag", "modified", "entries"}} from the last cycle."""
+        try:
+            feeds = jsonio.load_file(self.feeds_path)
+        except (OSError, ValueError):
+            return {}
+        return feeds if isinstance(feeds, dict) else {}
+
+    def save_validators(self, feeds):
+        with _exclusive(self.data_dir, FEEDS_NAME):
+            merged = self.validators()
+            merged.update(feeds)
+            atomic_write(self.feeds_path, jsonio.dumps(merged))
+
+    # Seen index
+
+    def _read_seen(self):
+        """Reads the index lines appended since the last call (all of them after a compaction)."""
+        try:
+            st = os.stat(self.seen_path)
+            size, inode = st.st_size, st.st_ino
+        except OSError:
+            size, inode = 0, None
+        if inode != self._inode:
+            # First read, or replaced by compact() (possibly in another process)
+            self._seen, self._offset, self._inode = {}, 0, inode
+        if size > self._offset:
+            with open(self.seen_path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            # Only whole lines; a line still being appended is picked up next time
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].decode("utf-8").splitlines():
+                day, _, key = line.partition("\t")
+                if key:
+                    self._seen.setdefault(key, day)
+            self._offset += end
+            metrics.FILE_OPS.inc(op="read")
+            metrics.FILE_BYTES.inc(end, op="read")
+
+    def _recover(self, day):
+        """Adds the keys of `day`'s stored articles, in case a cycle died before indexing them."""
+        if self._recovered == day:
+            return []
+        self._recovered = day
+        missing = []
+        try:
+            with open(self.articles_path(day), "rb") as f:
+                for line in f:
+                    try:
+                        keys = jsonio.loads(line).get("keys") or []
+                    except ValueError:
+                        continue  # torn last line
+                    missing.extend(k for k in keys if k not in self._seen)
+        except FileNotFoundError:
+            return []
+        return missing
+
+    # Articles
+
+    def add(self, articles, now=None):
+        """
+        Appends the articles (dicts with a "keys" list) not already stored.
+        Returns the ones that were new, in the order given.
+        """
+        now = now or datetime.utcnow()
+        day = now.strftime("%Y%m%d")
+        with self._lock, _exclusive(self.data_dir, SEEN_NAME):
+            self._read_seen()
+            recovered = self._recover(day)
+            if recovered:
+                logging.warning(f"Re-indexing {len(recovered)} stored article keys missing from {SEEN_NAME}")
+                self._append_seen(recovered, day)
+
+            fresh = []
+            batch = set()
+            for article in articles:
+                keys = article["keys"]
+                if any(k in self._seen or k in batch for k in keys):
+                    continue
+                batch.update(keys)
+                fresh.append(article)
+            if not fresh:
+                return []
+
+            # Articles first, then their keys: a crash in between is repaired by _recover()
+            os.makedirs(self.articles_dir, exist_ok=True)
+            data = b"".join(jsonio.dumps(a) + b"\n" for a in fresh)
+            with open(self.articles_path(day), "ab") as f:
+                f.write(data)
+            metrics.FILE_OPS.inc(op="write")
+            metrics.FILE_BYTES.inc(len(data), op="write")
+            self._append_seen([k for a in fresh for k in a["keys"]], day)
+            return fresh
+
+    def _append_seen(self, keys, day):
+        data = "".join(f"{day}\t{k}\n" for k in keys).encode("utf-8")
+        with open(self.seen_path, "ab") as f:
+            f.write(data)
+            self._inode = os.fstat(f.fileno()).st_ino
+        for key in keys:
+            self._seen.setdefault(key, day)
+        self._offset += len(data)
+
+    def read(self, day):
+        """The articles stored on `day` (YYYYmmdd), oldest first."""
+        articles = []
+        try:
+            with open(self.articles_path(day), "rb") as f:
+                for line in f:
+                    try:
+                        articles.append(jsonio.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return articles
+
+    def compact(self, now=None, archive_days=None):
+        """
+        Drops seen keys older than `seen_days` and, if `archive_days` is set,
+        article files older than that. Returns (keys dropped, files deleted).
+        """
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(days=self.seen_days)).strftime("%Y%m%d")
+        deleted = 0
+        with self._lock, _exclusive(self.data_dir, SEEN_NAME):
+            self._read_seen()
+            keep = {k: day for k, day in self._seen.items() if day >= cutoff}
+            dropped = len(self._seen) - len(keep)
+            if dropped:
+                data = "".join(f"{day}\t{k}\n" for k, day in keep.items()).encode("utf-8")
+                atomic_write(self.seen_path, data)
+                self._seen, self._offset, self._inode = keep, len(data), os.stat(self.seen_path).st_ino
+            if archive_days is not None and os.path.isdir(self.articles_dir):
+                oldest = (now - timedelta(days=archive_days)).strftime("%Y%m%d")
+                for name in os.listdir(self.articles_dir):
+                    if name.startswith("articles_") and name[9:17] < oldest:
+                        os.unlink(os.path.join(self.articles_dir, name))
+                        deleted += 1
+        return dropped, deleted
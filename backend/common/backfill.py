@@ -0,0 +1,116 @@
+"""
+One-time importer for the per-cycle CSV/JSON files already sitting in data/,
+including those compacted into daily archives (see retention.py).
+
+Usage (from the repository root):
+
+    python -m backend.common.backfill [--data-dir backend/data] [--db PATH]
+
+Safe to re-run: points already in the store are skipped.
+"""
+
+import argparse
+import csv
+import glob
+import io
+import os
+import re
+from datetime import datetime
+
+from . import deltas, jsonio, retention, series
+from .tsdb import DEFAULT_PATH, TimeSeriesStore
+
+TS_RE = re.compile(r"_(\d{8}_\d{6})\.(?:csv|json|delta\.json)$")
+CSE_ENDPOINTS = ["prices", "gainers", "losers", "summary", "indices"]
+NEWS_FEEDS = ["ada_derana", "daily_mirror"]
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+def file_ts(path):
+    """Timestamp encoded in a collector file name (<name>_YYYYmmdd_HHMMSS.ext)."""
+    m = TS_RE.search(path)
+    return datetime.strptime(m.group(1), "%Y%m%d_%H%M%S") if m else None
+
+
+def read_csv(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def read_json(text):
+    return jsonio.loads(text)
+
+
+def _read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def snapshot_files(data_dir, category, prefix):
+    """Yields (file name, content) for every per-cycle file, archived or not, oldest first."""
+    for _, archive in sorted(retention.archives(os.path.join(data_dir, category))):
+        if retention.ARCHIVE_RE.match(os.path.basename(archive)).group("prefix") == prefix:
+            yield from retention.read_archive(archive)
+    for path in sorted(glob.glob(os.path.join(data_dir, category, f"{prefix}_*"))):
+        if file_ts(path) is not None:
+            yield os.path.basename(path), _read_text(path)
+
+
+def iter_backlog(data_dir):
+    """Yields (file name, points) for every historical snapshot file under data_dir."""
+    for name, text in snapshot_files(data_dir, "cbsl", "rates"):
+        snap = read_json(text)
+        if isinstance(snap, dict):
+            snap.setdefault("fetched_at_utc", file_ts(name))
+            yield name, series.cbsl_points(snap)
+
+    for endpoint in CSE_ENDPOINTS:
+        rows = None
+        for name, text in snapshot_files(data_dir, "cse", endpoint):
+            if name.endswith(".csv"):
+                rows = read_csv(text)
+            elif name.endswith(deltas.DELTA_SUFFIX) and rows is None:
+                continue  # the chain's keyframe is gone
+            else:
+                rows = deltas.apply(rows, read_json(text))
+            yield name, series.cse_points(endpoint, rows, ts=file_ts(name))
+
+    for name, text in snapshot_files(data_dir, "traffic", "traffic"):
+        # The early traffic_*.json files used a different (road-level) schema
+        if name.endswith(".csv"):
+            yield name, series.traffic_points(read_csv(text))
+
+    for name, text in snapshot_files(data_dir, "weather", "weather"):
+        # As with traffic, the earliest weather files predate the current schema
+        snap = read_json(text)
+        if isinstance(snap, dict):
+            snap.setdefault("fetched_at", file_ts(name))
+            yield name, series.weather_points(snap)
+
+    for feed in NEWS_FEEDS:
+        for name, text in snapshot_files(data_dir, "news", feed):
+            yield name, series.news_points(feed, len(read_json(text) or []), file_ts(name))
+
+
+def import_backlog(data_dir, store):
+    files = points = 0
+    for path, file_points in iter_backlog(data_dir):
+        try:
+            points += store.append(file_points)
+            files += 1
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+    return files, points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    files, points = import_backlog(args.data_dir, TimeSeriesStore(args.db))
+    print(f"Imported {points} new points from {files} files into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Adaptive polling policy for the CSE collector, driven by ``marketStatus``.
+
+Each cycle the collector fetches ``status`` first and passes it to
+`policy.observe()`. It then fetches only the endpoints `policy.due()`
+returns, and the scheduler sleeps for `policy.next_delay()`:
+
+- while the market reports open, prices/gainers/losers are polled every
+  CSE_OPEN_INTERVAL seconds (default 20), and summary/indices at most once
+  a minute.
+- once it reports closed, every endpoint is fetched one more time for the
+  closing values. After that only the status is checked, hourly
+  (CSE_CLOSED_INTERVAL) and again at the scheduled open.
+- on weekends and on the holidays collected by events_collector.py nothing is
+  fetched at all.
+
+The policy is per process; it lives wherever the collectors run (see
+app/leader.py).
+"""
+
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from . import jsonio
+from .snapshots import DATA_DIR
+
+# CSE regular trading session, Asia/Colombo (UTC+05:30)
+COLOMBO_OFFSET = timedelta(hours=5, minutes=30)
+CSE_OPEN = (9, 30)
+CSE_CLOSE = (14, 30)
+
+FAST_ENDPOINTS = ("prices", "gainers", "losers")
+SLOW_ENDPOINTS = ("summary", "indices")
+SLOW_OPEN_INTERVAL = 60
+UNKNOWN_INTERVAL = 60
+
+EVENTS_PATH = os.path.join(DATA_DIR, "events", "events_latest.json")
+
+
+def _env_seconds(name, default):
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        logging.warning("Invalid %s; using %s", name, default)
+        return default
+
+
+def colombo_time(now=None):
+    return (now or datetime.utcnow()) + COLOMBO_OFFSET
+
+
+def cse_market_hours(now=None):
+    """True during the CSE trading session on weekdays (Colombo time), by the clock alone."""
+    local = colombo_time(now)
+    if local.weekday() >= 5:
+        return False
+    return CSE_OPEN <= (local.hour, local.minute) < CSE_CLOSE
+
+
+def status_is_open(status):
+    """Reads the marketStatus text ("Regular Trading", "Market Closed", ...)."""
+    text = str(status or "").lower()
+    if not text or "close" in text:
+        return False
+    return "trading" in text or "open" in text
+
+
+def load_holidays(path=EVENTS_PATH):
+    """Dates of the public holidays saved by events_collector.py (Nager.Date, or its fallback list)."""
+    try:
+        events = jsonio.load_file(path)
+    except (OSError, ValueError):
+        return set()
+    holidays = set()
+    for entry in (events.get("nager_holidays") or []) + (events.get("fallback") or []):
+        try:
+            holidays.add(date.fromisoformat(str(entry.get("date"))))
+        except (AttributeError, ValueError):
+            continue  # e.g. the recurring "YYYY-MM-DD" placeholder
+    return holidays
+
+
+class CsePollingPolicy:
+    def __init__(self, events_path=EVENTS_PATH):
+        self.open_interval = _env_seconds("CSE_OPEN_INTERVAL", 20)
+        self.closed_interval = _env_seconds("CSE_CLOSED_INTERVAL", 3600)
+        self.events_path = events_path
+        self.market_open = None  # unknown until the first status
+        self.status = None
+        self.closed_at = None  # when the market was first seen closed
+        self._fetched = {}  # endpoint -> last fetch (UTC)
+        self._holidays = (None, set())  # (events file mtime, dates)
+        self._lock = threading.Lock()
+
+    def holidays(self):
+        try:
+            mtime = os.stat(self.events_path).st_mtime_ns
+        except OSError:
+            return set()
+        if mtime != self._holidays[0]:
+            self._holidays = (mtime, load_holidays(self.events_path))
+        return self._holidays[1]
+
+    def trading_day(self, now=None):
+        local = colombo_time(now).date()
+        return local.weekday() < 5 and local not in self.holidays()
+
+    def observe(self, status, now=None):
+        """Records a marketStatus reading (the status text, or None if the fetch failed)."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self.status = status
+            if status is None:
+                # Unreachable: fall back to the session clock
+                is_open = cse_market_hours(now)
+            else:
+                is_open = status_is_open(status)
+            if not is_open and self.market_open is not False:
+                self.closed_at = now
+            self.market_open = is_open
+
+    def due(self, endpoints, now=None):
+        """The endpoints (other than status) to fetch this cycle."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            if not self.trading_day(now):
+                return []
+            if self.market_open is None:
+                return list(endpoints)
+            if not self.market_open:
+                # One full capture after the close (or at startup), then status checks only
+                return [e for e in endpoints if self._fetched.get(e, datetime.min) < self.closed_at]
+            return [
+                e for e in endpoints
+                if e not in SLOW_ENDPOINTS
+                or (now - self._fetched.get(e, datetime.min)).total_seconds() >= SLOW_OPEN_INTERVAL
+            ]
+
+    def fetched(self, endpoints, now=None):
+        now = now or datetime.utcnow()
+        with self._lock:
+            for endpoint in endpoints:
+                self._fetched[endpoint] = now
+
+    def next_delay(self, now=None):
+        """Seconds until the next cycle."""
+        now = now or datetime.utcnow()
+        if not self.trading_day(now):
+            # Sleep until just after Colombo midnight, then look at the calendar again
+            local = colombo_time(now)
+            midnight = datetime(local.year, local.month, local.day) + timedelta(days=1, seconds=60)
+            return max(60, (midnight - local).total_seconds())
+        if self.market_open is None:
+            return UNKNOWN_INTERVAL
+        if self.market_open:
+            return self.open_interval
+        local = colombo_time(now)
+        session_open = datetime(local.year, local.month, local.day, *CSE_OPEN)
+        if local < session_open:
+            # Don't sleep through the opening bell
+            return max(30, min(self.closed_interval, (session_open - local).total_seconds()))
+        return self.closed_interval
+
+    def state(self):
+        return {
+            "market_open": self.market_open,
+            "status": self.status,
+            "trading_day": self.trading_day(),
+            "next_delay": round(self.next_delay()),
+        }
+
+
+policy = CsePollingPolicy()
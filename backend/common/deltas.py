@@ -0,0 +1,173 @@
+"""
+Change-detected, delta-encoded snapshot logs for keyed tables (CSE prices, ...).
+
+A collector hands each fetched table to `SnapshotLog.save()`:
+
+- if its content hash matches the last saved one, nothing is written at all.
+- otherwise the log writes either a keyframe, ``<name>_<ts>.json`` holding
+  every row, or a delta, ``<name>_<ts>.delta.json`` holding only the rows
+  that were added, changed or removed against the previous snapshot.
+
+A keyframe starts every UTC day, so each day's files (and retention's daily
+archives) can be replayed on their own. One is also written after
+KEYFRAME_EVERY deltas, or when most rows changed anyway. The snapshot index
+(see snapshots.py) records the newest file together with its hash and its
+position in the delta chain. `reconstruct()` replays a snapshot on read.
+
+    {"fetched_at_utc": ..., "key": "symbol", "rows": [...]}                         keyframe
+    {"fetched_at_utc": ..., "key": "symbol", "base": <previous file>,
+     "upserts": [...], "deletes": [...]}                                            delta
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+
+from . import jsonio, metrics
+from .snapshots import CYCLE_FILE_RE, DATA_DIR, atomic_write, latest_snapshot, read_index, record_snapshot
+
+KEYFRAME_EVERY = 48
+# A delta touching more than this share of the rows is written as a keyframe instead
+MAX_DELTA_SHARE = 0.5
+DELTA_SUFFIX = ".delta.json"
+
+
+def _day(path):
+    m = CYCLE_FILE_RE.match(os.path.basename(path))
+    return m.group("ts")[:8] if m else None
+
+
+def content_hash(rows):
+    return hashlib.sha1(jsonio.dumps(rows)).hexdigest()
+
+
+def diff(previous, rows, key):
+    """Returns (upserts, deleted keys) turning `previous` into `rows`, both keyed by row[key]."""
+    before = {row.get(key): row for row in previous}
+    upserts = [row for row in rows if before.get(row.get(key)) != row]
+    current = {row.get(key) for row in rows}
+    deletes = [k for k in before if k not in current]
+    return upserts, deletes
+
+
+def apply(rows, doc):
+    """Rows after applying a keyframe or delta document to `rows` (the previous state)."""
+    if "rows" in doc:
+        return list(doc["rows"])
+    key = doc["key"]
+    updated = {row.get(key): row for row in doc.get("upserts", [])}
+    deleted = set(doc.get("deletes", []))
+    result = []
+    for row in rows:
+        k = row.get(key)
+        if k in deleted:
+            continue
+        result.append(updated.pop(k, row))
+    # Rows that weren't in the previous snapshot go at the end, in fetch order
+    result.extend(updated.values())
+    return result
+
+
+def reconstruct(path):
+    """Rows of the snapshot stored at `path` (a keyframe or the tip of a delta chain)."""
+    chain = []
+    while path.endswith(DELTA_SUFFIX):
+        doc = jsonio.load_file(path)
+        chain.append(doc)
+        path = os.path.join(os.path.dirname(path), doc["base"])
+    rows = jsonio.load_file(path)["rows"]
+    for doc in reversed(chain):
+        rows = apply(rows, doc)
+    return rows
+
+
+class SnapshotLog:
+    def __init__(self, directory, name, key=None, data_dir=DATA_DIR, keyframe_every=KEYFRAME_EVERY):
+        self.directory = directory
+        self.name = name
+        self.key = key  # None: no row identity, so every change is a keyframe
+        self.data_dir = data_dir
+        self.keyframe_every = keyframe_every
+        self._lock = threading.Lock()
+        self._rows = None  # rows of the newest saved snapshot, once known
+        self._path = None
+
+    def _head(self):
+        relpath = os.path.relpath(self.directory, self.data_dir).replace(os.sep, "/")
+        return read_index(self.data_dir).get(f"{relpath}/{self.name}") or {}
+
+    def latest_path(self):
+        category = os.path.relpath(self.directory, self.data_dir)
+        return latest_snapshot(category, self.name, self.data_dir)
+
+    def latest(self):
+        """Rows of the newest saved snapshot, or None."""
+        path = self.latest_path()
+        if path is None or path.endswith(".csv"):
+            return None  # written before delta encoding; callers read those themselves
+        if path != self._path:
+            self._rows, self._path = reconstruct(path), path
+        return self._rows
+
+    def at(self, when):
+        """
+        (path, rows) of the newest snapshot saved at or before `when` (a
+        datetime), or (None, None). Only covers files not yet archived by
+        retention.py.
+        """
+        target = when.strftime("%Y%m%d_%H%M%S")
+        best = None
+        for path in glob.glob(os.path.join(self.directory, f"{self.name}_*")):
+            m = CYCLE_FILE_RE.match(os.path.basename(path))
+            if m is None or m.group("prefix") != self.name or m.group("ext") == "csv" or m.group("ts") > target:
+                continue
+            if best is None or m.group("ts") > best[0]:
+                best = (m.group("ts"), path)
+        if best is None:
+            return None, None
+        return best[1], reconstruct(best[1])
+
+    def save(self, rows, now=None):
+        """
+        Saves `rows` (JSON-compatible dicts) unless they match the newest
+        snapshot. Returns (outcome, path) with outcome "unchanged", "delta" or
+        "keyframe".
+        """
+        now = now or datetime.utcnow()
+        digest = content_hash(rows)
+        with self._lock:
+            head = self._head()
+            if head.get("hash") == digest and head.get("path"):
+                metrics.SNAPSHOT_WRITES.inc(source=self.name, outcome="unchanged")
+                return "unchanged", os.path.join(self.data_dir, head["path"])
+
+            ts = now.strftime("%Y%m%d_%H%M%S")
+            doc = {"fetched_at_utc": now.isoformat(), "key": self.key}
+            chain = head.get("chain", 0) + 1
+            previous = None
+            try:
+                previous = self.latest() if self.key and head.get("hash") else None
+            except Exception as e:
+                logging.warning(f"Could not replay the previous {self.name} snapshot: {e}")
+            unique = self.key is not None and len({row.get(self.key) for row in rows}) == len(rows)
+            if previous is not None and unique and chain <= self.keyframe_every and _day(self._path) == ts[:8]:
+                upserts, deletes = diff(previous, rows, self.key)
+                if len(upserts) + len(deletes) <= MAX_DELTA_SHARE * max(len(rows), 1):
+                    doc.update(base=os.path.basename(self._path), upserts=upserts, deletes=deletes)
+
+            if "base" in doc:
+                outcome, path = "delta", os.path.join(self.directory, f"{self.name}_{ts}{DELTA_SUFFIX}")
+            else:
+                outcome, path, chain = "keyframe", os.path.join(self.directory, f"{self.name}_{ts}.json"), 0
+                doc["rows"] = rows
+            data = jsonio.dumps(doc)
+            atomic_write(path, data)
+            record_snapshot(path, self.data_dir, hash=digest, chain=chain)
+            self._rows, self._path = rows, path
+            metrics.SNAPSHOT_WRITES.inc(source=self.name, outcome=outcome)
+            metrics.FILE_OPS.inc(op="write")
+            metrics.FILE_BYTES.inc(len(data), op="write")
+            return outcome, path
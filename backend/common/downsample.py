@@ -0,0 +1,46 @@
+"""
+Largest-Triangle-Three-Buckets downsampling for chart series.
+
+Keeps the first and last points and, from each of `threshold - 2` equal
+slices in between, the point forming the largest triangle with the point
+kept before it and the average of the next slice. Peaks and troughs survive,
+unlike with plain decimation or averaging.
+"""
+
+
+def lttb(rows, threshold, x=0, y=1):
+    """
+    Reduces `rows` (sequences sorted by rows[i][x]) to at most `threshold`
+    of them. Rows are returned as-is, so extra columns (min, max, count, ...)
+    come along with the selected points.
+    """
+    n = len(rows)
+    if threshold is None or threshold >= n or n <= 2:
+        return list(rows)
+    if threshold < 3:
+        return [rows[0], rows[-1]][:max(threshold, 0)]
+
+    sampled = [rows[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        stop = int((i + 1) * every) + 1
+        # Average of the next slice (or the last point, for the final slice)
+        next_start, next_stop = stop, min(int((i + 2) * every) + 1, n)
+        if next_start >= next_stop:
+            next_start, next_stop = n - 1, n
+        count = next_stop - next_start
+        avg_x = sum(rows[j][x] for j in range(next_start, next_stop)) / count
+        avg_y = sum(rows[j][y] for j in range(next_start, next_stop)) / count
+
+        ax, ay = rows[a][x], rows[a][y]
+        best, best_area = start, -1.0
+        for j in range(start, stop):
+            area = abs((ax - avg_x) * (rows[j][y] - ay) - (ax - rows[j][x]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(rows[best])
+        a = best
+    sampled.append(rows[-1])
+    return sampled
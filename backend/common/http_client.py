@@ -0,0 +1,182 @@
+"""
+Shared HTTP layer for the collectors.
+
+One keep-alive ``requests.Session`` per host (connections are reused across
+cycles), a per-host concurrency cap and request rate, and retries with
+backoff that are limited by a per-host retry budget. Retries sleep in the
+worker thread that made the call, so a flaky endpoint only delays itself;
+``fan_out()`` runs a batch of calls concurrently so a sweep over many
+endpoints or cities takes roughly one round trip.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+
+
+class HostPolicy:
+    def __init__(self, max_concurrency=4, min_interval=0.0, retries=3, backoff=0.5,
+                 max_backoff=4.0, retry_budget=20, budget_window=60.0):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval    # seconds between request starts
+        self.retries = retries              # attempts per call
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_budget = retry_budget    # retries allowed per host per window
+        self.budget_window = budget_window
+
+
+HOST_POLICIES = {
+    "www.cse.lk": HostPolicy(max_concurrency=6, min_interval=0.1),
+    "api.tomtom.com": HostPolicy(max_concurrency=5, min_interval=0.2),
+    "api.openweathermap.org": HostPolicy(max_concurrency=5, min_interval=0.1),
+}
+DEFAULT_POLICY = HostPolicy()
+
+
+class RetryBudgetExceeded(RuntimeError):
+    pass
+
+
+class _Host:
+    def __init__(self, name, policy):
+        self.name = name
+        self.policy = policy
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.slots = threading.BoundedSemaphore(policy.max_concurrency)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        self._retries = []  # monotonic times of recent retries
+
+    def wait_turn(self):
+        if self.policy.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.policy.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def take_retry(self):
+        """Spends one retry from the host's budget; False if it's used up."""
+        with self._lock:
+            now = time.monotonic()
+            cutoff = now - self.policy.budget_window
+            self._retries = [t for t in self._retries if t > cutoff]
+            if len(self._retries) >= self.policy.retry_budget:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class CollectorHTTP:
+    def __init__(self, policies=None, max_workers=16):
+        self.policies = dict(HOST_POLICIES if policies is None else policies)
+        self.max_workers = max_workers
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _host(self, url):
+        name = urlsplit(url).netloc
+        host = self._hosts.get(name)
+        if host is None:
+            with self._lock:
+                host = self._hosts.get(name)
+                if host is None:
+                    host = _Host(name, self.policies.get(name, DEFAULT_POLICY))
+                    self._hosts[name] = host
+        return host
+
+    def request(self, method, url, retries=None, timeout=10, **kwargs):
+        """
+        Performs a request on the host's pooled session. Raises for HTTP errors
+        once the attempts (or the host's retry budget) are exhausted.
+        """
+        host = self._host(url)
+        attempts = retries if retries is not None else host.policy.retries
+        for attempt in range(1, attempts + 1):
+            try:
+                with host.slots:
+                    host.wait_turn()
+                    # Timed from after the rate-limit wait: this is upstream latency
+                    started = time.perf_counter()
+                    try:
+                        res = host.session.request(method, url, timeout=timeout, **kwargs)
+                    except Exception as e:
+                        metrics.HTTP_SECONDS.observe(time.perf_counter() - started, host=host.name, outcome="error")
+                        metrics.HTTP_REQUESTS.inc(host=host.name, status=type(e).__name__)
+                        raise
+                    metrics.HTTP_SECONDS.observe(time.perf_counter() - started, host=host.name,
+                                                 outcome="ok" if res.ok else "http_error")
+                    metrics.HTTP_REQUESTS.inc(host=host.name, status=res.status_code)
+                res.raise_for_status()
+                return res
+            except Exception as e:
+                logging.warning("Attempt %d failed for %s: %s", attempt, url, e)
+                if attempt >= attempts:
+                    raise
+                if not host.take_retry():
+                    metrics.HTTP_BUDGET_EXHAUSTED.inc(host=host.name)
+                    raise RetryBudgetExceeded(f"Retry budget for {host.name} exhausted") from e
+                metrics.HTTP_RETRIES.inc(host=host.name)
+                time.sleep(min(host.policy.max_backoff, host.policy.backoff * 2 ** (attempt - 1)))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def fan_out(self, fn, items):
+        """
+        Calls fn(item) for every item concurrently and returns a (result, error)
+        pair per item, in order: error is None on success, otherwise the
+        exception raised and result is None.
+
+        The pool is shared by every collector. A fan_out() made from inside a
+        call already running on it runs its items one by one in that thread
+        instead, since waiting on the pool from a pool thread can deadlock.
+        """
+        items = list(items)
+        if not items:
+            return []
+        if getattr(_worker, "active", False):
+            return [_call(fn, item) for item in items]
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector-http")
+        futures = [self._executor.submit(_run_in_worker, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+
+_worker = threading.local()  # marks threads of the fan_out() pool
+
+
+def _call(fn, item):
+    try:
+        return fn(item), None
+    except Exception as e:
+        return None, e
+
+
+def _run_in_worker(fn, item):
+    _worker.active = True
+    try:
+        return _call(fn, item)
+    finally:
+        _worker.active = False
+
+
+client = CollectorHTTP()
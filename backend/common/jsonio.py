@@ -0,0 +1,76 @@
+"""
+JSON encoding/decoding used by the collectors and the API.
+
+Uses orjson when it is installed (several times faster on the large nested
+payloads, and it serializes numpy arrays/scalars natively) and falls back to
+the stdlib otherwise. Output is compact UTF-8 bytes either way; nothing that
+is only read by machines is pretty-printed.
+"""
+
+import json
+import logging
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logging.getLogger(__name__).warning("orjson not installed; using the stdlib json module (pip install orjson)")
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(o):
+    # pandas.NA / pandas.NaT
+    if o.__class__.__name__ in ("NAType", "NaTType"):
+        return None
+    # pandas Timestamp / datetime / date
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    # numpy scalars and arrays the fast path didn't take, pandas objects
+    if hasattr(o, "tolist"):
+        return o.tolist()
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    def loads(data):
+        """Accepts str, bytes, bytearray or memoryview (e.g. over an mmap)."""
+        return orjson.loads(data)
+else:
+    def _finite(obj):
+        """`obj` with NaN and infinite floats replaced by None, as orjson writes them (null)."""
+        if isinstance(obj, float):
+            return obj if math.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {k: _finite(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [_finite(v) for v in obj]
+        return obj
+
+    def dumps(obj):
+        # NaN/Infinity are not valid JSON, and browsers reject them
+        return json.dumps(_finite(obj), default=lambda o: _finite(_default(o)), separators=(",", ":"),
+                          ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+    def loads(data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+def dump_file(path, obj):
+    with open(path, "wb") as f:
+        f.write(dumps(obj))
+
+
+def load_file(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
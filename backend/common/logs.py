@@ -0,0 +1,25 @@
+"""
+Per-collector log files.
+
+The collectors run in the scheduler's process (see app/scheduler.py), where
+only the first ``logging.basicConfig`` call would take effect. Each collector
+instead logs through its own named logger with a file handler next to its
+data, whether it runs in the scheduler or as a script.
+"""
+
+import logging
+import os
+
+FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+
+def collector_logger(name, folder):
+    """The logger for collector `name`, writing to ``<folder>/<name>.log``."""
+    logger = logging.getLogger(f"collectors.{name}")
+    logger.setLevel(logging.INFO)
+    path = os.path.abspath(os.path.join(folder, f"{name}.log"))
+    if not any(isinstance(h, logging.FileHandler) and h.baseFilename == path for h in logger.handlers):
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter(FORMAT))
+        logger.addHandler(handler)
+    return logger
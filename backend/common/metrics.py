@@ -0,0 +1,234 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+A small self-contained registry (counters, histograms, callback gauges) so the
+collectors, the processors and the ML engine can record timings without an
+extra dependency; the API renders it at ``/metrics``. Everything recorded
+here is per process.
+
+    with metrics.span("ml_trends"):
+        ...
+    metrics.CACHE_REQUESTS.inc(cache="snapshot", result="hit")
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans range from sub-millisecond cache reads to minute-long collector runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time; the callback returns {label tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def render(self):
+        try:
+            values = self.fn() if self.fn is not None else {}
+        except Exception:
+            values = {}
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, k if isinstance(k, tuple) else (k,))} {_number(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames=(), fn=None):
+        return self._register(Gauge(name, documentation, labelnames, fn))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "sa_stage_duration_seconds", "Time spent in a processor section or ML stage", ["stage"])
+STAGE_ERRORS = registry.counter(
+    "sa_stage_errors_total", "Processor sections or ML stages that raised", ["stage"])
+
+HTTP_SECONDS = registry.histogram(
+    "sa_upstream_request_duration_seconds", "Collector HTTP attempts by upstream host", ["host", "outcome"])
+HTTP_REQUESTS = registry.counter(
+    "sa_upstream_requests_total", "Collector HTTP attempts by upstream host and status", ["host", "status"])
+HTTP_RETRIES = registry.counter(
+    "sa_upstream_retries_total", "Collector HTTP retries by upstream host", ["host"])
+HTTP_BUDGET_EXHAUSTED = registry.counter(
+    "sa_upstream_retry_budget_exhausted_total", "Calls given up because the host's retry budget ran out", ["host"])
+
+COLLECTOR_SECONDS = registry.histogram(
+    "sa_collector_run_duration_seconds", "Duration of one collector cycle", ["collector"])
+COLLECTOR_RUNS = registry.counter(
+    "sa_collector_runs_total", "Collector cycles by outcome", ["collector", "outcome"])
+
+FILE_BYTES = registry.counter(
+    "sa_file_bytes_total", "Bytes read or written for snapshot files", ["op"])
+FILE_OPS = registry.counter(
+    "sa_file_operations_total", "Snapshot file reads and writes", ["op"])
+SNAPSHOT_WRITES = registry.counter(
+    "sa_snapshot_writes_total", "Change-detected snapshot saves by outcome (unchanged, delta, keyframe)",
+    ["source", "outcome"])
+NEWS_ENTRIES = registry.counter(
+    "sa_news_entries_total", "Feed entries by outcome (new, seen)", ["feed", "outcome"])
+
+CACHE_REQUESTS = registry.counter(
+    "sa_cache_requests_total", "Cache lookups by result (hit, miss, wait)", ["cache", "result"])
+
+API_SECONDS = registry.histogram(
+    "sa_api_request_duration_seconds", "API request latency by route", ["method", "route", "status"])
+
+
+@contextmanager
+def span(stage):
+    """Times a block into sa_stage_duration_seconds{stage=...} and counts failures."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def timed(stage):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
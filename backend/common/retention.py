@@ -0,0 +1,316 @@
+"""
+Retention, compaction and archival for the collectors' per-cycle files.
+
+Collectors save one ``<name>_YYYYmmdd_HHMMSS.csv|json`` file per cycle next to
+their ``*_latest.json``. Left alone these pile up by the hundred per day. One
+retention pass, run hourly by the collector leader or by hand with
+
+    python -m backend.common.retention
+
+does three things:
+
+- it merges per-cycle files older than the source's ``raw_days`` into one
+  gzipped JSON-lines archive per endpoint and day, at
+  ``<source>/archive/<name>_YYYYmmdd.jsonl.gz``. The original bytes are kept,
+  and backfill.py can still import them.
+- it deletes archives older than the source's ``archive_days``.
+- it prunes the time-series store: raw points and fine rollups past their
+  retention are deleted and the file is vacuumed (see tsdb.prune and
+  ``TSDB_RETENTION``).
+- it evicts the oldest archives, then the oldest per-cycle files, until the
+  whole data directory fits in ``DATA_DISK_BUDGET_MB``. A delta chain is
+  evicted newest file first, so what is left of it can still be replayed.
+
+The newest good snapshot of every endpoint (see snapshots.record_snapshot) and
+the ``*_latest.json`` files are never touched. The time-series store counts
+against the budget but is only ever shrunk by its own time-based retention,
+so the history survives compaction.
+
+Policies are overridden per source with a JSON environment variable, e.g.
+``RETENTION_POLICY='{"cse": {"raw_days": 1, "archive_days": 30}}'``.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from . import jsonio
+from .deltas import DELTA_SUFFIX
+from .snapshots import CYCLE_FILE_RE, DATA_DIR, atomic_write, read_index
+from .tsdb import DEFAULT_PATH as TSDB_PATH, TimeSeriesStore, get_store, to_epoch
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_RE = re.compile(r"^(?P<prefix>.+)_(?P<day>\d{8})\.jsonl\.gz$")
+DEFAULT_BUDGET_MB = 1024
+
+
+class Policy:
+    """Per-cycle files older than `raw_days` are archived; archives older than `archive_days` (None = never) are deleted."""
+
+    def __init__(self, raw_days=3, archive_days=365):
+        self.raw_days = raw_days
+        self.archive_days = archive_days
+
+    def __repr__(self):
+        return f"Policy(raw_days={self.raw_days}, archive_days={self.archive_days})"
+
+
+DEFAULT_POLICIES = {
+    "cse": Policy(raw_days=2, archive_days=180),
+    "traffic": Policy(raw_days=2, archive_days=180),
+    "news": Policy(raw_days=2, archive_days=90),
+    "cbsl": Policy(raw_days=7, archive_days=None),
+    "events": Policy(raw_days=7, archive_days=90),
+}
+DEFAULT_POLICY = Policy()
+
+
+def load_policies():
+    policies = dict(DEFAULT_POLICIES)
+    raw = os.getenv("RETENTION_POLICY")
+    if not raw:
+        return policies
+    try:
+        overrides = json.loads(raw)
+        for source, values in overrides.items():
+            base = policies.get(source, DEFAULT_POLICY)
+            policies[source] = Policy(
+                raw_days=values.get("raw_days", base.raw_days),
+                archive_days=values.get("archive_days", base.archive_days),
+            )
+    except (ValueError, AttributeError, TypeError) as e:
+        logging.warning("Ignoring invalid RETENTION_POLICY: %s", e)
+    return policies
+
+
+def disk_budget_bytes():
+    try:
+        return int(float(os.getenv("DATA_DISK_BUDGET_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024)
+    except ValueError:
+        logging.warning("Invalid DATA_DISK_BUDGET_MB; using %s", DEFAULT_BUDGET_MB)
+        return DEFAULT_BUDGET_MB * 1024 * 1024
+
+
+def _cycle_files(source_dir):
+    """Yields (prefix, YYYYmmdd_HHMMSS, path) for a source's per-cycle files."""
+    for entry in os.scandir(source_dir):
+        m = CYCLE_FILE_RE.match(entry.name)
+        if m is not None and entry.is_file():
+            yield m.group("prefix"), m.group("ts"), os.path.abspath(entry.path)
+
+
+def _protected(data_dir):
+    """
+    The newest good snapshot of each endpoint, as recorded in the snapshot
+    index, plus every file from the day of each endpoint's newest per-cycle
+    file on disk. That covers files saved before the index existed and the
+    delta chain leading up to the newest snapshot (see deltas.py).
+    """
+    protected = {os.path.abspath(os.path.join(data_dir, entry["path"])) for entry in read_index(data_dir).values()}
+    for source_dir in _source_dirs(data_dir):
+        files = list(_cycle_files(source_dir))
+        newest_day = {}
+        for prefix, ts, _ in files:
+            newest_day[prefix] = max(newest_day.get(prefix, ""), ts[:8])
+        protected.update(path for prefix, ts, path in files if ts[:8] == newest_day[prefix])
+    return protected
+
+
+def append_to_archive(archive, paths):
+    """
+    Adds the files in `paths` to `archive` as a new gzip member, replacing the
+    archive atomically. A crash before the sources are deleted only duplicates
+    them, and read_archive() drops the duplicates.
+    """
+    lines = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read().decode("utf-8", errors="replace")
+        lines.append(jsonio.dumps({"name": os.path.basename(path), "data": data}))
+    member = gzip.compress(b"\n".join(lines) + b"\n")
+    try:
+        with open(archive, "rb") as f:
+            existing = f.read()
+    except FileNotFoundError:
+        existing = b""
+    atomic_write(archive, existing + member)
+
+
+def read_archive(path):
+    """Yields (original file name, content) for each file in an archive, oldest first."""
+    seen = set()
+    with gzip.open(path, "rb") as f:
+        entries = [jsonio.loads(line) for line in f if line.strip()]
+    for entry in sorted(entries, key=lambda e: e["name"]):
+        if entry["name"] not in seen:
+            seen.add(entry["name"])
+            yield entry["name"], entry["data"]
+
+
+def compact(source_dir, policy, protected=(), now=None):
+    """Archives per-cycle files older than policy.raw_days. Returns (files archived, archives written)."""
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=policy.raw_days)).strftime("%Y%m%d")
+    groups = defaultdict(list)
+    for prefix, ts, path in _cycle_files(source_dir):
+        if ts[:8] < cutoff and path not in protected:
+            groups[(prefix, ts[:8])].append(path)
+
+    files = 0
+    for (prefix, day), paths in sorted(groups.items()):
+        archive = os.path.join(source_dir, ARCHIVE_DIR, f"{prefix}_{day}.jsonl.gz")
+        try:
+            append_to_archive(archive, sorted(paths))
+        except Exception as e:
+            logging.error(f"Failed to archive {len(paths)} files into {archive}: {e}")
+            continue
+        for path in paths:
+            os.unlink(path)
+        files += len(paths)
+    return files, len(groups)
+
+
+def archives(source_dir):
+    """Yields (day, path) for every archive of a source."""
+    directory = os.path.join(source_dir, ARCHIVE_DIR)
+    if not os.path.isdir(directory):
+        return
+    for entry in os.scandir(directory):
+        m = ARCHIVE_RE.match(entry.name)
+        if m is not None:
+            yield m.group("day"), entry.path
+
+
+def expire_archives(source_dir, policy, now=None):
+    if policy.archive_days is None:
+        return 0
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=policy.archive_days)).strftime("%Y%m%d")
+    expired = 0
+    for day, path in archives(source_dir):
+        if day < cutoff:
+            os.unlink(path)
+            expired += 1
+    return expired
+
+
+def disk_usage(data_dir):
+    total = 0
+    for root, _, names in os.walk(data_dir):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _eviction_order(source_dir, protected=()):
+    """
+    Yields (day, segment, position, path) for a source's unprotected per-cycle
+    files. A segment is a keyframe and the deltas that build on it; its files
+    are numbered newest first, so evicting in this order never leaves a delta
+    without its base.
+    """
+    by_prefix = defaultdict(list)
+    for prefix, ts, path in _cycle_files(source_dir):
+        by_prefix[prefix].append((ts, path))
+    for prefix, files in by_prefix.items():
+        segment = []
+        for ts, path in sorted(files) + [(None, None)]:
+            if path is None or not path.endswith(DELTA_SUFFIX):
+                # A keyframe (or the end) closes the previous segment
+                if segment:
+                    start = segment[0][0]
+                    for position, (ts_, path_) in enumerate(reversed(segment)):
+                        if path_ not in protected:
+                            yield start[:8], f"{prefix}_{start}", position, path_
+                segment = []
+            if path is not None:
+                segment.append((ts, path))
+
+
+def enforce_budget(data_dir, budget, protected=()):
+    """
+    Deletes the oldest archives, then the oldest per-cycle files (a delta chain
+    newest file first), until data_dir fits in `budget` bytes.
+    """
+    total = disk_usage(data_dir)
+    if total <= budget:
+        return 0, total
+
+    candidates = []
+    for source_dir in _source_dirs(data_dir):
+        for day, path in archives(source_dir):
+            candidates.append((day, 0, "", 0, path))
+        for day, segment, position, path in _eviction_order(source_dir, protected):
+            candidates.append((day, 1, segment, position, path))
+
+    evicted = 0
+    for *_, path in sorted(candidates):
+        if total <= budget:
+            break
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        evicted += 1
+    if total > budget:
+        # What's left is the time-series store (pruned by age, not size), the logs and the latest snapshots
+        logging.warning("Data directory still uses %.1f MB, over its %.1f MB budget",
+                        total / 2**20, budget / 2**20)
+    return evicted, total
+
+
+def _source_dirs(data_dir):
+    return sorted(entry.path for entry in os.scandir(data_dir) if entry.is_dir())
+
+
+def prune_tsdb(data_dir, now=None):
+    """Applies the time-series store's retention (see tsdb.prune); None if data_dir has no store."""
+    path = os.path.join(data_dir, os.path.basename(TSDB_PATH))
+    if not os.path.exists(path):
+        return None
+    store = get_store() if os.path.abspath(path) == os.path.abspath(TSDB_PATH) else TimeSeriesStore(path)
+    try:
+        return store.prune(now=to_epoch(now) if now is not None else None)
+    except Exception as e:
+        logging.error(f"Time-series pruning failed: {e}")
+        return None
+
+
+def run(data_dir=DATA_DIR, policies=None, budget=None, now=None):
+    """One retention pass over every source directory. Returns a summary."""
+    policies = policies if policies is not None else load_policies()
+    budget = budget if budget is not None else disk_budget_bytes()
+    protected = _protected(data_dir)
+    summary = {"archived_files": 0, "archives_written": 0, "archives_expired": 0}
+    for source_dir in _source_dirs(data_dir):
+        policy = policies.get(os.path.basename(source_dir), DEFAULT_POLICY)
+        files, written = compact(source_dir, policy, protected, now)
+        summary["archived_files"] += files
+        summary["archives_written"] += written
+        summary["archives_expired"] += expire_archives(source_dir, policy, now)
+    summary["tsdb"] = prune_tsdb(data_dir, now)
+    summary["evicted_files"], summary["bytes"] = enforce_budget(data_dir, budget, protected)
+    logging.info("Retention pass: %s", summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact and prune the collectors' per-cycle files.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--budget-mb", type=float, help="override DATA_DISK_BUDGET_MB")
+    args = parser.parse_args()
+
+    budget = int(args.budget_mb * 1024 * 1024) if args.budget_mb is not None else None
+    print(run(args.data_dir, budget=budget))
+
+
+if __name__ == "__main__":
+    main()
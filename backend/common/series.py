@@ -0,0 +1,102 @@
+"""
+Extracts numeric time-series points from collector snapshots.
+
+Each function takes a snapshot in the shape a collector produces (or the shape
+it was saved in on disk) and yields (source, entity, metric, ts, value) tuples
+for the time-series store. The collectors and the backlog importer share them
+so live and imported history look the same.
+"""
+
+import ast
+
+
+def _num(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None  # drop NaN
+
+
+def cbsl_points(snapshot):
+    ts = snapshot.get("fetched_at_utc")
+    for currency, info in (snapshot.get("rates") or {}).items():
+        yield ("cbsl", currency, "lkr_per_unit", ts, _num(info.get("lkr_per_unit")))
+
+
+def _index_rows(row):
+    # marketIndices comes back as {"0": {...}, "1": {...}}, which the collector
+    # saves as a single row of dicts (or of their repr() when read from CSV)
+    if "indexName" in row or "indexValue" in row:
+        yield row
+        return
+    for cell in row.values():
+        if isinstance(cell, str) and cell.startswith("{"):
+            try:
+                cell = ast.literal_eval(cell)
+            except (ValueError, SyntaxError):
+                continue
+        if isinstance(cell, dict):
+            yield cell
+
+
+def cse_points(name, rows, ts=None):
+    """
+    `name` is the CSE endpoint key used by cse_collector (prices, gainers, ...).
+    Gainers and losers yield nothing: they are a subset of `prices`, fetched
+    seconds apart, and writing them into the same series would add spurious
+    samples to every top mover's price history.
+    """
+    for row in rows:
+        row_ts = row.get("fetched_at_utc") or ts
+        if name == "prices":
+            symbol = row.get("symbol")
+            if not symbol:
+                continue
+            yield ("cse", symbol, "price", row_ts, _num(row.get("lastTradedPrice")))
+            yield ("cse", symbol, "change_pct", row_ts, _num(row.get("changePercentage")))
+            yield ("cse", symbol, "volume", row_ts, _num(row.get("crossingVolume")))
+        elif name == "summary":
+            yield ("cse", "market", "turnover", row_ts, _num(row.get("tradeVolume")))
+            yield ("cse", "market", "share_volume", row_ts, _num(row.get("shareVolume")))
+        elif name == "indices":
+            for idx in _index_rows(row):
+                entity = idx.get("symbol") or idx.get("indexName")
+                if not entity:
+                    continue
+                yield ("cse_index", entity, "value", row_ts, _num(idx.get("indexValue")))
+                yield ("cse_index", entity, "change_pct", row_ts, _num(idx.get("percentage")))
+                yield ("cse_index", entity, "turnover", row_ts, _num(idx.get("sectorTurnoverToday")))
+
+
+def traffic_points(rows):
+    for row in rows:
+        city = row.get("city")
+        if not city:
+            continue
+        ts = row.get("fetched_at_utc")
+        yield ("traffic", city, "congestion_percent", ts, _num(row.get("congestion_percent")))
+        yield ("traffic", city, "incident_count", ts, _num(row.get("incident_count")))
+
+
+def weather_points(snapshot):
+    ts = snapshot.get("fetched_at")
+    for city, loc in (snapshot.get("locations") or {}).items():
+        if "error" in loc:
+            continue
+        main = loc.get("main") or {}
+        yield ("weather", city, "temp", ts, _num(main.get("temp")))
+        yield ("weather", city, "humidity", ts, _num(main.get("humidity")))
+
+
+def news_points(feed, headlines, ts, entries=None, new=None):
+    """
+    `headlines` is the feed's headlines in the collector's window (at most 20),
+    `entries` the number of entries the feed lists and `new` how many of them
+    were stored for the first time.
+    """
+    yield ("news", feed, "headline_count", ts, float(headlines))
+    if entries is not None:
+        yield ("news", feed, "feed_entries", ts, float(entries))
+    if new is not None:
+        yield ("news", feed, "new_articles", ts, float(new))
@@ -0,0 +1,259 @@
+"""
+Atomic publishing and change-aware reading of the collectors' latest files.
+
+Writers go through `publish_json` / `publish_bytes`: the content is written to
+a temp file in the same directory, fsynced and renamed over the target, so a
+reader opens either the old file or the new one, never a half-written one.
+Every publish also bumps that file's generation in ``data/manifest.json``.
+
+`SnapshotReader` keeps the parsed content of each file together with the
+generation it was parsed at, and only re-reads (through mmap) files whose
+generation moved. Files not in the manifest fall back to their inode, mtime
+and size.
+
+Collectors also register each per-cycle file they save
+(``<name>_YYYYmmdd_HHMMSS.csv|json``) in ``data/snapshot_index.json``, so the
+newest good snapshot of an endpoint is one lookup instead of a directory scan.
+"""
+
+import glob
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from . import jsonio, metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are only serialized within the process
+    fcntl = None
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data"))
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "snapshot_index.json"
+
+# Per-cycle files written by the collectors, e.g. cse/prices_20251209_073255.csv
+CYCLE_FILE_RE = re.compile(r"^(?P<prefix>.+)_(?P<ts>\d{8}_\d{6})\.(?P<ext>csv|json|delta\.json)$")
+
+_manifest_lock = threading.Lock()
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data):
+    """Replaces `path` with `data` (bytes) via temp file + fsync + rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+def _relpath(path, data_dir):
+    return os.path.relpath(os.path.abspath(path), data_dir).replace(os.sep, "/")
+
+
+def read_manifest(data_dir=DATA_DIR):
+    try:
+        with open(os.path.join(data_dir, MANIFEST_NAME), "rb") as f:
+            manifest = jsonio.loads(f.read())
+    except (OSError, ValueError):
+        return {"generation": 0, "files": {}}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("files"), dict):
+        return {"generation": 0, "files": {}}
+    return manifest
+
+
+@contextmanager
+def _exclusive(data_dir, name):
+    """Serializes read-modify-write of a shared file in data_dir across threads and processes."""
+    with _manifest_lock:
+        lock_fd = None
+        if fcntl is not None:
+            # Collectors may also run as separate processes (`python cse_collector.py`)
+            os.makedirs(data_dir, exist_ok=True)
+            lock_fd = os.open(os.path.join(data_dir, name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if lock_fd is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+                os.close(lock_fd)
+
+
+def _bump_generation(path, data_dir):
+    with _exclusive(data_dir, MANIFEST_NAME):
+        manifest = read_manifest(data_dir)
+        generation = int(manifest.get("generation", 0)) + 1
+        manifest["generation"] = generation
+        st = os.stat(path)
+        manifest["files"][_relpath(path, data_dir)] = {
+            "generation": generation, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+        }
+        atomic_write(os.path.join(data_dir, MANIFEST_NAME), jsonio.dumps(manifest))
+        return generation
+
+
+def publish_bytes(path, data, data_dir=DATA_DIR):
+    """Atomically replaces `path` and records a new generation for it. Returns the generation."""
+    atomic_write(path, data)
+    metrics.FILE_OPS.inc(op="write")
+    metrics.FILE_BYTES.inc(len(data), op="write")
+    try:
+        return _bump_generation(path, data_dir)
+    except Exception as e:
+        # The file itself is in place; readers fall back to its stat signature
+        logging.error(f"Failed to update snapshot manifest for {path}: {e}")
+        return None
+
+
+def publish_json(path, obj, data_dir=DATA_DIR):
+    """Compact JSON (these files are only read by machines); see common/jsonio.py."""
+    return publish_bytes(path, jsonio.dumps(obj), data_dir)
+
+
+def read_index(data_dir=DATA_DIR):
+    try:
+        index = jsonio.load_file(os.path.join(data_dir, INDEX_NAME))
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _index_key(path, data_dir):
+    m = CYCLE_FILE_RE.match(os.path.basename(path))
+    if m is None:
+        raise ValueError(f"not a per-cycle snapshot file: {path}")
+    return f"{_relpath(os.path.dirname(path), data_dir)}/{m.group('prefix')}"
+
+
+def record_snapshot(path, data_dir=DATA_DIR, **extra):
+    """
+    Marks `path` (a per-cycle file that was just saved) as the newest good
+    snapshot of its endpoint. `extra` is stored alongside (e.g. a content hash).
+    """
+    try:
+        key = _index_key(path, data_dir)
+        with _exclusive(data_dir, INDEX_NAME):
+            index = read_index(data_dir)
+            index[key] = {"path": _relpath(path, data_dir), "saved": datetime.utcnow().isoformat(), **extra}
+            atomic_write(os.path.join(data_dir, INDEX_NAME), jsonio.dumps(index))
+    except Exception as e:
+        logging.error(f"Failed to update snapshot index for {path}: {e}")
+
+
+def latest_snapshot(category, prefix, data_dir=DATA_DIR):
+    """
+    Path of the newest good per-cycle file for `category/prefix` (e.g. "cse",
+    "prices"), or None. Scans the directory only when the index has no entry
+    (first run after an upgrade) and records what it finds.
+    """
+    entry = read_index(data_dir).get(f"{category}/{prefix}")
+    if entry:
+        path = os.path.join(data_dir, entry["path"])
+        if os.path.exists(path):
+            return path
+    candidates = []
+    for p in glob.glob(os.path.join(data_dir, category, f"{prefix}_*")):
+        m = CYCLE_FILE_RE.match(os.path.basename(p))
+        if m is not None and m.group("prefix") == prefix:
+            candidates.append(p)
+    if not candidates:
+        return None
+    # The timestamp in the name sorts chronologically
+    newest = max(candidates, key=os.path.basename)
+    record_snapshot(newest, data_dir)
+    return newest
+
+
+def _load_mapped(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise ValueError("empty file")
+        metrics.FILE_OPS.inc(op="read")
+        metrics.FILE_BYTES.inc(size, op="read")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # orjson parses straight from the mapping; the stdlib fallback copies it once
+            with memoryview(mm) as view:
+                return jsonio.loads(view)
+
+
+class SnapshotReader:
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._manifest = (None, {})  # (manifest stat signature, files)
+        self._entries = {}  # relpath -> (signature, parsed value)
+
+    def _manifest_files(self):
+        path = os.path.join(self.data_dir, MANIFEST_NAME)
+        try:
+            st = os.stat(path)
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+        if signature != self._manifest[0]:
+            files = read_manifest(self.data_dir)["files"] if signature else {}
+            self._manifest = (signature, files)
+        return self._manifest[1]
+
+    def _signature(self, relpath, path):
+        st = os.stat(path)  # raises if the file is missing
+        info = self._manifest_files().get(relpath)
+        # A file replaced without going through publish_*() (manual edit, older
+        # collector) no longer matches what the manifest recorded
+        if info and info.get("size") == st.st_size and info.get("mtime_ns") == st.st_mtime_ns:
+            return ("gen", info.get("generation"), st.st_size)
+        return ("stat", st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def read(self, relpath, default=None):
+        """Parsed content of `data_dir/relpath`; re-parsed only when its generation changes."""
+        path = os.path.join(self.data_dir, relpath)
+        try:
+            signature = self._signature(relpath, path)
+        except OSError:
+            return default
+        with self._lock:
+            cached = self._entries.get(relpath)
+        if cached is not None and cached[0] == signature:
+            metrics.CACHE_REQUESTS.inc(cache="snapshot_file", result="hit")
+            return cached[1]
+        metrics.CACHE_REQUESTS.inc(cache="snapshot_file", result="miss")
+        try:
+            value = _load_mapped(path)
+        except Exception as e:
+            logging.error(f"Error reading {path}: {e}")
+            # Keep serving the last good parse rather than dropping the section
+            return cached[1] if cached is not None else default
+        with self._lock:
+            self._entries[relpath] = (signature, value)
+        return value
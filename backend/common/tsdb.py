@@ -0,0 +1,335 @@
+"""
+Append-only time-series store for collector history.
+
+A single embedded SQLite file (``data/timeseries.db``) holds every numeric
+point the collectors produce, keyed by (source, entity, metric, ts). The
+primary key doubles as the index, so a range query such as "USD/LKR for the
+last 7 days" is one index seek plus a scan of the matching rows, no matter how
+many snapshots have been collected. WAL mode lets the API read while a
+collector appends.
+
+Every inserted point also updates count/sum/min/max/last aggregates for its
+1m, 15m, 1h and 1d buckets in the ``rollups`` table (an insert trigger, so
+live collectors and the backlog importer are covered alike). A chart query
+then reads one row per bucket instead of every raw point in the window.
+
+`prune()`, run hourly by the retention pass (see retention.py), keeps the file
+bounded. It drops raw points and fine rollups older than RETENTION_DAYS and
+returns the freed pages to the filesystem with an incremental vacuum. Coarse
+rollups outlive the raw points they were built from.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "timeseries.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    source TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (source, entity, metric, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS points_by_time ON points (source, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    source TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    last REAL,
+    last_ts INTEGER NOT NULL,
+    PRIMARY KEY (source, entity, metric, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+# Rollup bucket widths in seconds
+ROLLUP_RESOLUTIONS = {"1m": 60, "15m": 900, "1h": 3600, "1d": 86400}
+
+# Bumped when the rollup layout changes; older stores are rebuilt from `points` on open
+SCHEMA_VERSION = 1
+
+# Days kept per granularity (None = forever). Raw points must cover the market
+# anomaly baseline (30 days, see ml_engine/anomaly.py).
+RETENTION_DAYS = {"raw": 90, "1m": 14, "15m": 180, "1h": None, "1d": None}
+
+_ROLLUP_UPSERT = """
+    INSERT INTO rollups VALUES (
+        NEW.source, NEW.entity, NEW.metric, {width}, (NEW.ts / {width}) * {width},
+        1, NEW.value, NEW.value, NEW.value, NEW.value, NEW.ts
+    ) ON CONFLICT (source, entity, metric, resolution, bucket) DO UPDATE SET
+        count = count + 1,
+        sum = sum + excluded.sum,
+        min = MIN(min, excluded.min),
+        max = MAX(max, excluded.max),
+        last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END,
+        last_ts = MAX(last_ts, excluded.last_ts);"""
+
+ROLLUP_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS points_rollup AFTER INSERT ON points BEGIN"
+    + "".join(_ROLLUP_UPSERT.format(width=width) for width in ROLLUP_RESOLUTIONS.values())
+    + "\nEND;"
+)
+
+
+def load_retention():
+    """RETENTION_DAYS, overridden by e.g. ``TSDB_RETENTION='{"raw": 30, "1h": 730}'``."""
+    retention = dict(RETENTION_DAYS)
+    raw = os.getenv("TSDB_RETENTION")
+    if not raw:
+        return retention
+    try:
+        overrides = json.loads(raw)
+        for name, days in overrides.items():
+            if name in retention:
+                retention[name] = None if days is None else float(days)
+    except (ValueError, AttributeError, TypeError) as e:
+        logging.warning("Ignoring invalid TSDB_RETENTION: %s", e)
+    return retention
+
+
+def retained_since(name, retention=None, now=None):
+    """Oldest epoch second still kept at granularity `name` ("raw" or a rollup), or None if kept forever."""
+    days = (retention or load_retention()).get(name)
+    if days is None:
+        return None
+    return int(now if now is not None else time.time()) - int(days * 86400)
+
+
+def to_epoch(value):
+    """Converts an ISO timestamp, datetime or epoch number to integer UTC seconds."""
+    if value is None:
+        return int(time.time())
+    if isinstance(value, (int, float)):
+        # CSE reports epoch milliseconds
+        return int(value / 1000) if value > 1e11 else int(value)
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        return int((dt - datetime(1970, 1, 1)).total_seconds())
+    return int(dt.timestamp())
+
+
+class TimeSeriesStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = os.path.abspath(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            # Only takes effect on a new file; lets prune() hand pages back without a full VACUUM
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._migrate(conn)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                started = time.perf_counter()
+                self._rebuild_rollups(conn)
+                conn.execute(ROLLUP_TRIGGER)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                logging.info("Built time-series rollups in %.1fs", time.perf_counter() - started)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _rebuild_rollups(conn):
+        """Recomputes every rollup from the raw points (one-off, for stores written before rollups)."""
+        conn.execute("DELETE FROM rollups")
+        for width in ROLLUP_RESOLUTIONS.values():
+            conn.execute(
+                "INSERT INTO rollups SELECT source, entity, metric, ?, (ts / ?) * ?, "
+                "COUNT(*), SUM(value), MIN(value), MAX(value), NULL, MAX(ts) FROM points "
+                "WHERE value IS NOT NULL GROUP BY source, entity, metric, (ts / ?) * ?",
+                (width, width, width, width, width),
+            )
+        conn.execute(
+            "UPDATE rollups SET last = (SELECT value FROM points p WHERE p.source = rollups.source "
+            "AND p.entity = rollups.entity AND p.metric = rollups.metric AND p.ts = rollups.last_ts)"
+        )
+
+    def append(self, points):
+        """
+        Appends (source, entity, metric, ts, value) tuples. `ts` may be anything
+        to_epoch() accepts. Points already stored for the same key are kept as-is,
+        so re-importing a snapshot is harmless. Returns the number of new points.
+        """
+        rows = [(s, str(e), m, to_epoch(ts), float(v)) for s, e, m, ts, v in points if v is not None]
+        if not rows:
+            return 0
+        conn = self._conn()
+        with conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO points VALUES (?, ?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+
+    def query(self, source, entity, metric, start=None, end=None, limit=None):
+        """Returns [(ts, value), ...] for one series in ascending time order."""
+        sql = "SELECT ts, value FROM points WHERE source = ? AND entity = ? AND metric = ?"
+        args = [source, str(entity), metric]
+        if start is not None:
+            sql += " AND ts >= ?"
+            args.append(to_epoch(start))
+        if end is not None:
+            sql += " AND ts <= ?"
+            args.append(to_epoch(end))
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return self._conn().execute(sql, args).fetchall()
+
+    def query_source(self, source, metric, start=None, end=None):
+        """Returns [(entity, ts, value), ...] for every entity of a source."""
+        sql = "SELECT entity, ts, value FROM points WHERE source = ? AND metric = ?"
+        args = [source, metric]
+        if start is not None:
+            sql += " AND ts >= ?"
+            args.append(to_epoch(start))
+        if end is not None:
+            sql += " AND ts <= ?"
+            args.append(to_epoch(end))
+        sql += " ORDER BY entity, ts"
+        return self._conn().execute(sql, args).fetchall()
+
+    def rollup(self, source, entity, metric, resolution, start=None, end=None):
+        """
+        Returns [(bucket_start, mean, min, max, last, count), ...] for one series
+        at a ROLLUP_RESOLUTIONS width (in seconds). Buckets overlapping `start`
+        are included. Reads one row per bucket, however many points they hold.
+        """
+        sql = ("SELECT bucket, sum / count, min, max, last, count FROM rollups "
+               "WHERE source = ? AND entity = ? AND metric = ? AND resolution = ?")
+        args = [source, str(entity), metric, int(resolution)]
+        if start is not None:
+            sql += " AND bucket >= ?"
+            args.append(to_epoch(start) // int(resolution) * int(resolution))
+        if end is not None:
+            sql += " AND bucket <= ?"
+            args.append(to_epoch(end))
+        sql += " ORDER BY bucket"
+        return self._conn().execute(sql, args).fetchall()
+
+    def series_latest_ts(self, source, entity, metric):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT MAX(ts) FROM points WHERE source = ? AND entity = ? AND metric = ?",
+            (source, str(entity), metric),
+        ).fetchone()
+        if row and row[0] is not None:
+            return row[0]
+        # Raw points already pruned: the daily rollups still cover the series
+        row = conn.execute(
+            "SELECT MAX(last_ts) FROM rollups WHERE source = ? AND entity = ? AND metric = ? AND resolution = ?",
+            (source, str(entity), metric, ROLLUP_RESOLUTIONS["1d"]),
+        ).fetchone()
+        return row[0] if row else None
+
+    def entities(self, source, metric=None):
+        sql = "SELECT DISTINCT entity FROM points WHERE source = ?"
+        args = [source]
+        if metric is not None:
+            sql += " AND metric = ?"
+            args.append(metric)
+        return [row[0] for row in self._conn().execute(sql, args)]
+
+    def latest_ts(self, source):
+        row = self._conn().execute("SELECT MAX(ts) FROM points WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def prune(self, retention=None, now=None):
+        """
+        Deletes raw points and rollup buckets older than their retention, then
+        vacuums the freed pages. Returns {"points": n, "rollups": n, "freed_pages": n}.
+        """
+        retention = retention or load_retention()
+        conn = self._conn()
+        summary = {"points": 0, "rollups": 0, "freed_pages": 0}
+        cutoff = retained_since("raw", retention, now)
+        if cutoff is not None:
+            sources = [row[0] for row in conn.execute("SELECT DISTINCT source FROM points")]
+            for source in sources:
+                # (source, ts) is indexed; one source at a time keeps each write transaction short
+                with conn:
+                    summary["points"] += conn.execute(
+                        "DELETE FROM points WHERE source = ? AND ts < ?", (source, cutoff)).rowcount
+        for name, width in ROLLUP_RESOLUTIONS.items():
+            cutoff = retained_since(name, retention, now)
+            if cutoff is not None:
+                with conn:
+                    summary["rollups"] += conn.execute(
+                        "DELETE FROM rollups WHERE resolution = ? AND bucket < ?", (width, cutoff)).rowcount
+        summary["freed_pages"] = self._vacuum(conn)
+        return summary
+
+    @staticmethod
+    def _vacuum(conn):
+        """Returns free pages to the filesystem. Returns how many were freed."""
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            return 0
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Stores created without incremental auto-vacuum need one full VACUUM to switch
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript("PRAGMA incremental_vacuum;")
+        return free
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store on the default path."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TimeSeriesStore()
+    return _store
+
+
+def record(points):
+    """Appends points to the default store. Failures are logged, never raised,
+    so a store problem can't stop a collector from publishing its snapshot."""
+    try:
+        return get_store().append(points)
+    except Exception as e:
+        logging.warning("Time-series store append failed: %s", e)
+        return 0
@@ -1,38 +1,45 @@
-import random
-import numpy as np
+import sys
 from collections import Counter
 
-# Optional imports with graceful degradation
-try:
-    import spacy
-    try:
-        nlp = spacy.load("en_core_web_sm")
-    except OSError:
-        print("Warning: Spacy model 'en_core_web_sm' not found. Run 'python -m spacy download en_core_web_sm'")
-        nlp = None
-except (ImportError, RuntimeError, Exception) as e:
-    print(f"Warning: Spacy import failed ({e}). Trend detection will be limited.")
-    spacy = None
-    nlp = None
+from .trends import extractor as entity_extractor
 
-try:
-    from sklearn.ensemble import IsolationForest
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.cluster import KMeans
-    SKLEARN_AVAILABLE = True
-except (ImportError, Exception) as e:
-    print(f"Warning: Scikit-learn import failed ({e}). Anomaly detection and clustering will be disabled.")
-    SKLEARN_AVAILABLE = False
+# numpy, scikit-learn and spaCy are only imported when a stage first runs (or
+# from warm_up()), so importing this module doesn't slow down API startup
+
+def _market_anomalies():
+    from .anomaly import engine
+    return engine
+
+def _topic_clusterer():
+    from .clustering import clusterer
+    return clusterer
+
+def warm_up():
+    """Loads the NER model and scikit-learn and fits the market baseline ahead of the first request."""
+    entity_extractor.warm_up()
+    _topic_clusterer().load()
+    _market_anomalies().refresh()
+
+def readiness():
+    """Load state of each ML component; never triggers loading."""
+    clustering = sys.modules.get(f"{__package__}.clustering")
+    anomaly = sys.modules.get(f"{__package__}.anomaly")
+    return {
+        "ner": entity_extractor.state,
+        "clustering": clustering.clusterer.state if clustering else "not_loaded",
+        "market_anomalies": anomaly.engine.state if anomaly else "not_loaded",
+    }
 
 def detect_trends(data):
     """
     Detects trends using Spacy NER to find frequent entities in news.
+    Entities are cached per headline, so only new headlines hit the model.
     """
     trends = []
     news = data.get("news", [])
     
-    if not news or not nlp:
-        if not nlp:
+    if not news or not entity_extractor.available:
+        if not entity_extractor.available:
             return [{
                 "type": "error",
                 "description": "ML Model Missing. Server restarting to download...",
@@ -41,15 +48,8 @@ def detect_trends(data):
             }]
         return trends
 
-    # Combine titles for analysis
-    titles = [n.get("title", "") for n in news]
-    text = " ".join(titles)
-    
-    doc = nlp(text)
-    
-    # Extract interesting entities (Organizations, Countries, People, Events)
-    target_labels = ["ORG", "GPE", "PERSON", "EVENT", "PRODUCT"]
-    entities = [ent.text for ent in doc.ents if ent.label_ in target_labels]
+    titles = [n.get("title") or "" for n in news]
+    entities = [ent for ents in entity_extractor.entities(titles) for ent in ents]
     
     # Find most common entities
     if entities:
@@ -71,7 +71,8 @@ def detect_trends(data):
 
 def detect_anomalies(data):
     """
-    Detects anomalies using Isolation Forest on numerical data.
+    Detects weather alerts (rule-based) and unusual CSE price moves, scored
+    against each symbol's real price history (see anomaly.py).
     """
     anomalies = []
     
@@ -81,88 +82,35 @@ def detect_anomalies(data):
         if w.get("alert"):
             anomalies.append({"type": "weather", "severity": "High", "description": f"{w['alert']} in {w['city']}"})
             
-    # 2. Market Anomalies (Isolation Forest)
-    if not SKLEARN_AVAILABLE:
-        if not anomalies:
-            anomalies.append({
-                "type": "error",
-                "severity": "Warning",
-                "description": "Anomaly Detection Disabled (Scikit-learn missing)"
-            })
-        return anomalies
-
-    # In a real scenario, we'd fetch historical price data. 
-    # Here, we simulate a stream of prices to demonstrate the logic.
-    
-    # Simulate historical data (normal distribution) + current point
-    # Let's assume we are tracking a specific index or stock
-    mock_history = np.random.normal(loc=100, scale=5, size=100)
-    
-    # Add a potential anomaly from the current data if available
-    current_price = 100 # Default
-    if data.get("cse_gainers"):
-        # Just taking the first gainer's price as a sample point to check
-        try:
-            current_price = float(data["cse_gainers"][0].get("price", 100))
-        except (ValueError, TypeError):
-            pass
-            
-    # Combine history and current point
-    data_points = np.append(mock_history, current_price).reshape(-1, 1)
-    
-    # Train Isolation Forest
-    clf = IsolationForest(contamination=0.05, random_state=42)
-    clf.fit(data_points)
-    
-    # Predict on the last point (current_price)
-    # -1 is anomaly, 1 is normal
-    prediction = clf.predict([data_points[-1]])[0]
-    
-    if prediction == -1:
-        anomalies.append({
-            "type": "market_anomaly", 
-            "severity": "Medium", 
-            "description": f"Unusual price level detected: {current_price}"
-        })
+    # 2. Market Anomalies (pre-fitted per-symbol baseline, no fitting here)
+    ticks = data.get("cse_prices", []) + data.get("cse_gainers", []) + data.get("cse_losers", [])
+    anomalies.extend(_market_anomalies().detect(ticks))
          
     return anomalies
 
 def cluster_events(data):
     """
-    Clusters news events using TF-IDF and K-Means.
+    Assigns news headlines to stable topic clusters (see clustering.py).
+    Only headlines not seen in earlier cycles are vectorized.
     """
-    if not SKLEARN_AVAILABLE:
+    topic_clusterer = _topic_clusterer()
+    if not topic_clusterer.available:
         return ["Clustering disabled (Scikit-learn missing)"]
 
     news = data.get("news", [])
     if len(news) < 3:
         return ["Not enough data to cluster"]
         
-    titles = [n.get("title", "") for n in news]
-    
-    # Vectorize text
-    vectorizer = TfidfVectorizer(stop_words='english')
-    try:
-        X = vectorizer.fit_transform(titles)
-    except ValueError:
+    titles = [n.get("title") or "" for n in news]
+    clusters = topic_clusterer.summarize(titles)
+    if not clusters:
         return ["Clustering failed (empty vocabulary)"]
-    
-    # Cluster (adjust K based on data size, here K=3 for demo)
-    k = min(3, len(titles))
-    kmeans = KMeans(n_clusters=k, random_state=42)
-    kmeans.fit(X)
-    
-    clusters = {}
-    for i, label in enumerate(kmeans.labels_):
-        if label not in clusters:
-            clusters[label] = []
-        clusters[label].append(titles[i])
         
     # Format output
     result = []
-    for label, items in clusters.items():
-        # Just taking the first item as a representative "topic" for now
-        topic = items[0][:30] + "..." if len(items[0]) > 30 else items[0]
-        result.append(f"Cluster {label+1}: {topic} ({len(items)} items)")
+    for c in clusters:
+        title = c["title"]
+        topic = title[:30] + "..." if len(title) > 30 else title
+        result.append(f"Cluster {c['id']}: {topic} ({c['size']} items)")
         
     return result
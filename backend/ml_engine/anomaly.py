@@ -0,0 +1,218 @@
+"""
+Market anomaly detection over real CSE price history.
+
+The model is a per-symbol robust baseline of tick-to-tick log returns, fitted
+in a single pass over the price history in the time-series store
+(prices_*.csv / gainers_*.csv snapshots, see common/backfill.py). The first
+fit runs in the caller, since there is nothing to score against without it.
+Later refits run on a background thread, and only when the store has newer
+CSE data than the fitted model; the request path just looks the symbol up and
+computes a z-score.
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+try:
+    from backend.common import metrics
+    from backend.common.tsdb import get_store, to_epoch
+except ImportError:
+    from common import metrics
+    from common.tsdb import get_store, to_epoch
+
+HISTORY_DAYS = 30
+MIN_RETURNS = 5       # symbols with fewer returns than this are not scored
+MIN_SCALE = 0.002     # floor for the return scale (0.2%), CSE ticks are coarse
+THRESHOLD = 4.0       # robust z-score above which a move is anomalous
+MAX_RESULTS = 5
+
+
+class MarketBaseline:
+    """Fitted per-symbol state: last two observed prices and the return scale."""
+
+    def __init__(self, symbols, last_ts, last_price, prev_price, center, scale, n, fitted_ts):
+        self.index = {sym: i for i, sym in enumerate(symbols)}
+        self.symbols = symbols
+        self.last_ts = last_ts
+        self.last_price = last_price
+        self.prev_price = prev_price
+        self.center = center
+        self.scale = scale
+        self.n = n
+        self.fitted_ts = fitted_ts
+
+
+def fit_baseline(rows, fitted_ts=None):
+    """
+    rows: [(symbol, ts, price), ...] sorted by symbol then ts, as returned by
+    TimeSeriesStore.query_source(). Returns a MarketBaseline.
+    """
+    if not rows:
+        return None
+    symbols_col = np.array([r[0] for r in rows])
+    ts = np.array([r[1] for r in rows], dtype=np.int64)
+    price = np.array([r[2] for r in rows], dtype=np.float64)
+
+    # Group boundaries: rows are sorted by symbol, so each symbol is one run
+    starts = np.flatnonzero(np.r_[True, symbols_col[1:] != symbols_col[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+
+    valid = price > 0
+    logp = np.where(valid, np.log(np.where(valid, price, 1.0)), np.nan)
+    rets = np.diff(logp)
+    same_symbol = symbols_col[1:] == symbols_col[:-1]
+    rets[~same_symbol] = np.nan
+
+    k = len(starts)
+    center = np.zeros(k)
+    scale = np.full(k, MIN_SCALE)
+    n = np.zeros(k, dtype=np.int64)
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        r = rets[s:e - 1]
+        r = r[np.isfinite(r)]
+        n[i] = len(r)
+        if len(r) == 0:
+            continue
+        med = np.median(r)
+        mad = 1.4826 * np.median(np.abs(r - med))
+        center[i] = med
+        # Most ticks don't move, which collapses the MAD; fall back to the std
+        scale[i] = max(mad, float(np.std(r)), MIN_SCALE)
+
+    last_idx = ends - 1
+    prev_idx = np.maximum(ends - 2, starts)
+    return MarketBaseline(
+        symbols=[str(s) for s in symbols_col[starts]],
+        last_ts=ts[last_idx],
+        last_price=price[last_idx],
+        prev_price=price[prev_idx],
+        center=center,
+        scale=scale,
+        n=n,
+        fitted_ts=fitted_ts if fitted_ts is not None else int(ts.max()),
+    )
+
+
+def score_ticks(baseline, ticks):
+    """
+    Scores current CSE rows (prices/gainers/losers dicts) against the baseline.
+    Returns anomaly dicts, most extreme first.
+    """
+    if baseline is None:
+        return []
+    seen = set()
+    found = []
+    for tick in ticks:
+        symbol = tick.get("symbol")
+        if not symbol or symbol in seen:
+            continue
+        seen.add(symbol)
+        i = baseline.index.get(symbol)
+        if i is None or baseline.n[i] < MIN_RETURNS:
+            continue
+        try:
+            price = float(tick.get("lastTradedPrice", tick.get("price")))
+        except (TypeError, ValueError):
+            continue
+        if price <= 0:
+            continue
+        # If this tick is already part of the fitted history, compare it with
+        # the observation before it rather than with itself
+        tick_ts = to_epoch(tick.get("fetched_at_utc")) if tick.get("fetched_at_utc") else None
+        ref = baseline.prev_price[i] if tick_ts is not None and tick_ts <= baseline.last_ts[i] else baseline.last_price[i]
+        if ref <= 0:
+            continue
+        ret = float(np.log(price / ref))
+        z = (ret - baseline.center[i]) / baseline.scale[i]
+        if abs(z) >= THRESHOLD:
+            found.append({
+                "type": "market_anomaly",
+                "severity": "High" if abs(z) >= 2 * THRESHOLD else "Medium",
+                "description": (
+                    f"Unusual move in {symbol}: {np.expm1(ret) * 100:+.1f}% since last tick "
+                    f"(typical ±{np.expm1(baseline.scale[i]) * 100:.1f}%)"
+                ),
+                "symbol": symbol,
+                "score": round(float(z), 2),
+            })
+    found.sort(key=lambda a: -abs(a["score"]))
+    return found[:MAX_RESULTS]
+
+
+class MarketAnomalyEngine:
+    """Holds the fitted baseline; fits it on first use and refits it in the background when the store has new ticks."""
+
+    def __init__(self, store=None):
+        self._store = store
+        self.baseline = None
+        self._lock = threading.Lock()
+        self._first_fit = threading.Lock()
+        self._refitting = False
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    @property
+    def state(self):
+        if self.baseline is not None:
+            return "ready"
+        return "fitting" if self._refitting else "not_loaded"
+
+    def refit(self):
+        # Read-only: an empty store is seeded by the collector leader (app/leader.py)
+        store = self.store
+        latest = store.latest_ts("cse")
+        if latest is None:
+            return
+        rows = store.query_source("cse", "price", start=latest - HISTORY_DAYS * 86400)
+        self.baseline = fit_baseline(rows, fitted_ts=latest)
+
+    def _fit(self):
+        try:
+            with metrics.span("anomaly_refit"):
+                self.refit()
+        except Exception as e:
+            logging.error(f"Market anomaly refit failed: {e}")
+
+    def _refit_in_background(self):
+        try:
+            self._fit()
+        finally:
+            with self._lock:
+                self._refitting = False
+
+    def refresh(self):
+        """
+        Fits the model now if there is none yet; otherwise starts a background
+        refit if the store has CSE data newer than the model.
+        """
+        try:
+            latest = self.store.latest_ts("cse")
+        except Exception as e:
+            logging.error(f"Market anomaly store check failed: {e}")
+            return
+        if latest is None:
+            return
+        if self.baseline is None:
+            # Concurrent first callers wait for the one fit rather than each running it
+            with self._first_fit:
+                if self.baseline is None:
+                    self._fit()
+            return
+        if latest <= self.baseline.fitted_ts:
+            return
+        with self._lock:
+            if self._refitting:
+                return
+            self._refitting = True
+        threading.Thread(target=self._refit_in_background, name="anomaly-refit", daemon=True).start()
+
+    def detect(self, ticks):
+        self.refresh()
+        return score_ticks(self.baseline, ticks)
+
+
+engine = MarketAnomalyEngine()
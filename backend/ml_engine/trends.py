@@ -0,0 +1,115 @@
+"""
+Named-entity extraction for news trends.
+
+spaCy and ``en_core_web_sm`` are loaded on first use (or from warm_up()), with
+only the components NER needs. Entities are cached per headline, keyed by a
+hash of its text, so each collector cycle only runs the model over headlines
+it hasn't seen before, batched through ``nlp.pipe``.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from backend.common import metrics
+except ImportError:
+    from common import metrics
+
+MODEL_NAME = "en_core_web_sm"
+# NER in the small English model doesn't depend on these
+EXCLUDED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+TARGET_LABELS = {"ORG", "GPE", "PERSON", "EVENT", "PRODUCT"}
+CACHE_SIZE = 5000
+BATCH_SIZE = 64
+
+
+def headline_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class EntityExtractor:
+    def __init__(self, model_name=MODEL_NAME, cache_size=CACHE_SIZE):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self._nlp = None
+        self._load_error = None
+        self._load_lock = threading.Lock()
+        self._cache = OrderedDict()  # headline hash -> [entity text, ...]
+        self._cache_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.load() is not None
+
+    def load(self):
+        """Loads the spaCy pipeline once; returns None if spaCy or the model is missing."""
+        if self._nlp is not None or self._load_error is not None:
+            return self._nlp
+        with self._load_lock:
+            if self._nlp is None and self._load_error is None:
+                try:
+                    with metrics.span("ner_model_load"):
+                        import spacy
+                        self._nlp = spacy.load(self.model_name, exclude=EXCLUDED_COMPONENTS)
+                except OSError as e:
+                    print(f"Warning: Spacy model '{self.model_name}' not found. Run 'python -m spacy download {self.model_name}'")
+                    self._load_error = e
+                except Exception as e:
+                    print(f"Warning: Spacy import failed ({e}). Trend detection will be limited.")
+                    self._load_error = e
+        return self._nlp
+
+    def warm_up(self):
+        self.load()
+
+    @property
+    def state(self):
+        """"ready", "unavailable", "loading" or "not_loaded"; never triggers a load."""
+        if self._nlp is not None:
+            return "ready"
+        if self._load_error is not None:
+            return "unavailable"
+        return "loading" if self._load_lock.locked() else "not_loaded"
+
+    def entities(self, titles):
+        """Returns one list of target-label entity texts per title."""
+        nlp = self.load()
+        if nlp is None:
+            return [[] for _ in titles]
+
+        keys = [headline_key(t) for t in titles]
+        results = {}
+        missing = []
+        with self._cache_lock:
+            for key, title in zip(keys, titles):
+                if key in results:
+                    continue
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[key] = cached
+                else:
+                    results[key] = None
+                    missing.append((key, title))
+
+        metrics.CACHE_REQUESTS.inc(len(titles) - len(missing), cache="ner", result="hit")
+        metrics.CACHE_REQUESTS.inc(len(missing), cache="ner", result="miss")
+        if missing:
+            with metrics.span("ner_pipe"):
+                docs = nlp.pipe((title for _, title in missing), batch_size=BATCH_SIZE)
+                fresh = [
+                    (key, [ent.text for ent in doc.ents if ent.label_ in TARGET_LABELS])
+                    for (key, _), doc in zip(missing, docs)
+                ]
+            with self._cache_lock:
+                for key, ents in fresh:
+                    results[key] = ents
+                    self._cache[key] = ents
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [results[key] for key in keys]
+
+
+extractor = EntityExtractor()
@@ -0,0 +1,6 @@
+import { proxyJson } from '@/lib/proxy';
+
+export async function GET(request: Request, { params }: { params: Promise<{ source: string }> }) {
+    const { source } = await params;
+    return proxyJson(request, `/api/history/${encodeURIComponent(source)}`, 'Failed to fetch history');
+}
@@ -13,6 +13,7 @@ import { RiskDonut } from '@/components/RiskDonut';
 import { EventsCard } from '@/components/EventsCard';
 import { ExchangeRateCard } from '@/components/ExchangeRateCard';
 import { MLInsights } from '@/components/MLInsights';
+import { useDashboardStream } from '@/lib/useDashboardStream';
 
 // Dynamic import for Map to avoid SSR issues
 const TrafficMap = dynamic(() => import('@/components/TrafficMap'), {
@@ -25,12 +26,21 @@ const fetcher = (url: string) => fetch(url).then((res) => res.json());
 export default function Dashboard() {
     const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000";
 
-    const { data: signals, error: signalsError } = useSWR(`${API_URL}/api/signals`, fetcher, { refreshInterval: 5000 });
+    // Pushed snapshots replace polling; SWR only polls while the stream is down
+    const { snapshot, connected } = useDashboardStream(`${API_URL}/api/stream`);
+    const poll = (path: string) => (connected ? null : `${API_URL}${path}`);
 
-    const isSystemLive = !signalsError && signals;
-    const { data: market } = useSWR(`${API_URL}/api/market`, fetcher, { refreshInterval: 5000 });
-    const { data: risk } = useSWR(`${API_URL}/api/risk`, fetcher, { refreshInterval: 5000 });
-    const { data: opportunities } = useSWR(`${API_URL}/api/opportunities`, fetcher, { refreshInterval: 5000 });
+    const { data: polledSignals, error: signalsError } = useSWR(poll('/api/signals?view=slim'), fetcher, { refreshInterval: 5000 });
+    const { data: polledMarket } = useSWR(poll('/api/market?fields=status,gainers,losers'), fetcher, { refreshInterval: 5000 });
+    const { data: polledRisk } = useSWR(poll('/api/risk'), fetcher, { refreshInterval: 5000 });
+    const { data: polledOpportunities } = useSWR(poll('/api/opportunities'), fetcher, { refreshInterval: 5000 });
+
+    const signals = connected ? snapshot?.signals : (polledSignals ?? snapshot?.signals);
+    const market = connected ? snapshot?.market : (polledMarket ?? snapshot?.market);
+    const risk = connected ? snapshot?.risk : (polledRisk ?? snapshot?.risk);
+    const opportunities = connected ? snapshot?.opportunities : (polledOpportunities ?? snapshot?.opportunities);
+
+    const isSystemLive = connected || (!signalsError && signals);
 
     return (
         <div className="min-h-screen bg-slate-950 text-slate-100 p-4 md:p-6 lg:p-8 font-sans">
@@ -0,0 +1,38 @@
+import { NextResponse } from 'next/server';
+
+const BACKEND_URL = process.env.BACKEND_URL || 'http://localhost:8000';
+
+/**
+ * Proxies a backend JSON endpoint, forwarding If-None-Match and the backend's
+ * ETag so an unchanged resource costs a 304 instead of a full body. The body
+ * is passed through untouched so the ETag stays valid for it. The backend is
+ * asked for the identity encoding: `fetch` would decompress a gzip/br body,
+ * and the backend's "-gz"/"-br" ETag would then name a representation this
+ * proxy never serves. The query string (fields, view, paging) is forwarded
+ * as-is.
+ */
+export async function proxyJson(request: Request, path: string, errorMessage: string) {
+    try {
+        const headers: Record<string, string> = { 'Accept-Encoding': 'identity' };
+        const ifNoneMatch = request.headers.get('if-none-match');
+        if (ifNoneMatch) headers['If-None-Match'] = ifNoneMatch;
+
+        const { search } = new URL(request.url);
+        const res = await fetch(`${BACKEND_URL}${path}${search}`, { cache: 'no-store', headers });
+        const etag = res.headers.get('etag');
+        const validators: Record<string, string> = etag ? { ETag: etag, 'Cache-Control': 'no-cache' } : {};
+
+        if (res.status === 304) {
+            return new NextResponse(null, { status: 304, headers: validators });
+        }
+        if (!res.ok) throw new Error(errorMessage);
+
+        return new NextResponse(await res.text(), {
+            status: 200,
+            headers: { 'Content-Type': 'application/json', ...validators },
+        });
+    } catch (error) {
+        console.error(`Error fetching ${path}:`, error);
+        return NextResponse.json({ error: errorMessage }, { status: 500 });
+    }
+}
@@ -0,0 +1,36 @@
+"use client"
+
+import { useEffect, useState } from "react"
+
+// Payload of the backend's /api/stream `snapshot` event
+export interface DashboardSnapshot {
+    signals: any
+    risk: any
+    opportunities: any
+    market: any
+}
+
+/**
+ * Subscribes to the backend's Server-Sent Events channel. `connected` is false
+ * until the first snapshot arrives and whenever the stream drops, so callers
+ * can fall back to polling in the meantime (EventSource reconnects by itself).
+ */
+export function useDashboardStream(url: string) {
+    const [snapshot, setSnapshot] = useState<DashboardSnapshot | null>(null)
+    const [connected, setConnected] = useState(false)
+
+    useEffect(() => {
+        if (typeof EventSource === "undefined") return
+
+        const source = new EventSource(url)
+        source.addEventListener("snapshot", (event) => {
+            setSnapshot(JSON.parse((event as MessageEvent).data))
+            setConnected(true)
+        })
+        source.onerror = () => setConnected(false)
+
+        return () => source.close()
+    }, [url])
+
+    return { snapshot, connected }
+}